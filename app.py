@@ -4,10 +4,27 @@ import numpy as np
 import pandas as pd
 import time
 import os
-import tempfile
-import threading
 import datetime
+import functools
 from datetime import datetime, timedelta
+from utils.cache import load_cached_frame, file_digest
+from utils.patient_store import PatientStore
+from utils.uploads import UploadStore
+from utils.catalog import PatientCatalog
+from utils.preload import CohortPreloader
+from utils.live_feed import FeedServer, DEFAULT_FEED_PORT, bed_key
+from utils.tail import TailerRegistry
+from utils.trend_buffer import TrendBuffer
+from utils.decimate import FrameDecimator
+from utils.figures import FigureRegistry
+from utils.downsample import PyramidCache
+from utils.payload import PayloadMetrics, VALUE_DTYPE, value_array, time_array
+from utils.risk import calculate_risk_array
+from utils.risk_index import RiskTimelineIndex
+from utils.resample import ResampleIndex, METHODS as RESAMPLE_METHODS
+from utils.playback import PlaybackClock, PLAYBACK_SPEEDS
+from utils.stats import RiskStats
+from utils.schema import TIME, MAP, CO, SVV, PPV, NOMINAL_INTERVAL_SECONDS
 
 # Function to convert hex colors to RGB
 def hex_to_rgb(hex_color):
@@ -31,21 +48,67 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Create temp directory to store uploaded files
-temp_dir = tempfile.mkdtemp()
+# Process-wide patient store shared by every browser session
+@st.cache_resource
+def get_patient_store():
+    return PatientStore()
 
-# Function to delete file after 10 minutes
-def delete_file_after_delay(file_path, delay_seconds=600):
-    def delete_task():
-        time.sleep(delay_seconds)
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            pass  # Silently fail if file can't be deleted
-    
-    # Start thread to delete file after delay
-    threading.Thread(target=delete_task, daemon=True).start()
+patient_store = get_patient_store()
+
+# Precomputed risk timelines, one per patient and scoring model version; a timeline is dropped
+# from memory when the store evicts or releases its record
+@st.cache_resource
+def get_risk_index():
+    index = RiskTimelineIndex()
+    patient_store.add_forget_hook(index.forget)
+    return index
+
+risk_index = get_risk_index()
+
+# Recordings resampled on uniform grids, shared by every session; dropped with their record like the risk timelines
+@st.cache_resource
+def get_resample_index():
+    index = ResampleIndex()
+    patient_store.add_forget_hook(index.forget)
+    return index
+
+resample_index = get_resample_index()
+
+# Uploaded files: one temp directory per server process, expired by a single janitor thread
+@st.cache_resource
+def get_upload_store():
+    return UploadStore()
+
+upload_store = get_upload_store()
+
+# Content-addressed catalog of the patient workbooks; its manifest drives the patient selector
+@st.cache_resource
+def get_patient_catalog():
+    return PatientCatalog(patient_store.folder_path).scan()
+
+patient_catalog = get_patient_catalog()
+
+# Warm the shared store at server start: each distinct workbook is parsed and scored in a process pool
+@st.cache_resource
+def get_cohort_preloader():
+    return CohortPreloader(patient_store, risk_index, patient_catalog).start()
+
+cohort_preloader = get_cohort_preloader()
+
+# Live monitor feed (started the first time a session enables it); port and protocol from the environment
+@st.cache_resource
+def get_feed_server():
+    port = int(os.environ.get("ROSPHERE_FEED_PORT", DEFAULT_FEED_PORT))
+    protocol = os.environ.get("ROSPHERE_FEED_PROTOCOL", "tcp")
+    return FeedServer(patient_store, port=port, protocol=protocol).start()
+
+# One poller per followed export file, shared by every session watching it; only the most recent
+# few files keep a polling thread
+@st.cache_resource
+def get_tailer_registry():
+    return TailerRegistry(patient_store)
+
+tailer_registry = get_tailer_registry()
 
 # Custom CSS styling
 st.markdown("""
@@ -161,13 +224,6 @@ st.markdown("""
         box-shadow: 0 2px 6px rgba(0, 0, 0, 0.3);
     }
     
-    /* Scrollable charts */
-    .scrollable-chart {
-        overflow-x: auto;
-        padding-bottom: 5px;
-        margin-bottom: 5px;
-    }
-    
     /* Patient selector styling */
     .stSelectbox div[data-baseweb="select"] > div {
         background-color: #ffffff !important;
@@ -261,6 +317,47 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Functions to create charts
+def add_envelope_band(fig, fillcolor):
+    """
+    Adds the (empty) min/max band of decimated points (several samples merged
+    into one frame), drawn as a filled area behind the trend line
+    """
+    fig.add_trace(go.Scatter(x=[], y=[], mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False))
+    fig.add_trace(go.Scatter(x=[], y=[], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor=fillcolor, hoverinfo='skip', showlegend=False))
+
+def set_envelope_band(lo_trace, hi_trace, x_data, envelope):
+    """Updates the band traces in place; no band when the points are not decimated"""
+    lo, hi = envelope if envelope is not None else ([], [])
+    lo_trace.update(x=x_data if envelope is not None else [], y=value_array(lo))
+    hi_trace.update(x=x_data if envelope is not None else [], y=value_array(hi))
+
+def add_flag_markers(fig):
+    """
+    Adds the (empty) overlay of the points whose samples were corrected by the
+    artifact cleaning (out of range, spike or filled gap): hollow gray markers
+    """
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='markers',
+        marker=dict(size=8, color='rgba(0, 0, 0, 0)', line=dict(color='#B0B0B0', width=1.5)),
+        name="Cleaned sample",
+        hovertemplate='Time: %{x}<br>Cleaned: %{y:.2f}<extra></extra>',
+        showlegend=False
+    ))
+
+def set_flag_markers(trace, x_data, y_data, flagged):
+    """Updates the cleaned-sample overlay in place"""
+    idx = np.flatnonzero(flagged) if flagged is not None else np.empty(0, dtype=np.intp)
+    trace.update(x=np.asarray(x_data)[idx], y=np.asarray(y_data)[idx])
+
+def update_gauge_chart(fig, value):
+    """Moves the value and needle of a gauge built by create_gauge_chart or create_risk_gauge"""
+    indicator = fig.data[0]
+    indicator.value = value
+    indicator.gauge.threshold.value = value
+
 def create_gauge_chart(value, title, min_val, max_val, thresholds, container_width=400, container_height=150):
     colors = ['#32CD32', '#FFD700', '#FF4500']  # Green, Yellow, Red
     
@@ -309,8 +406,12 @@ def create_gauge_chart(value, title, min_val, max_val, thresholds, container_wid
     
     return fig
 
-def create_trend_graph(x_data, y_data, title, container_width=400, container_height=80, scrollable=True, 
-                      show_thresholds=False, thresholds=None, colors=None):
+def create_trend_graph(x_data, y_data, title, container_width=400, container_height=80,
+                      show_thresholds=False, thresholds=None, colors=None, envelope=None, flagged=None):
+    """
+    Creates a channel trend chart of fixed width: callers pass points already
+    downsampled to the chart's point budget (see trend_view)
+    """
     # Define colors for thresholds if not provided
     if colors is None:
         colors = ['#32CD32', '#FFD700', '#FF4500']  # Green, Yellow, Red
@@ -323,8 +424,9 @@ def create_trend_graph(x_data, y_data, title, container_width=400, container_hei
             # First threshold
             if i == 0:
                 fig.add_trace(go.Scatter(
-                    x=x_data,
-                    y=[thresholds[i]] * len(x_data),
+                    x=[],
+                    y=[],
+                    meta=thresholds[i],
                     fill=None,
                     mode='lines',
                     line=dict(color=colors[i], width=1, dash='dash'),
@@ -336,18 +438,22 @@ def create_trend_graph(x_data, y_data, title, container_width=400, container_hei
                 rgba_color = f'rgba({int(rgb_values[0]*255)}, {int(rgb_values[1]*255)}, {int(rgb_values[2]*255)}, 0.2)'
                 
                 fig.add_trace(go.Scatter(
-                    x=x_data,
-                    y=[0] * len(x_data),
+                    x=[],
+                    y=[],
+                    meta=0,
                     fill='tonexty',
                     mode='none',
                     fillcolor=rgba_color,
                     showlegend=False
                 ))
     
+    # Min/max band of the samples merged into each point
+    add_envelope_band(fig, 'rgba(255, 0, 0, 0.25)')
+    
     # Add the trend line
     fig.add_trace(go.Scatter(
-        x=x_data, 
-        y=y_data,
+        x=[], 
+        y=[],
         mode='lines+markers',
         line=dict(color='red', width=2),
         marker=dict(size=4, color='red'),
@@ -355,10 +461,13 @@ def create_trend_graph(x_data, y_data, title, container_width=400, container_hei
         hovertemplate='Time: %{x}<br>Value: %{y:.2f}<extra></extra>'
     ))
     
+    # Samples corrected by the artifact cleaning
+    add_flag_markers(fig)
+    
     # Configure layout
     fig.update_layout(
         title=None,
-        width=container_width if not scrollable else max(container_width, len(x_data) * 30),
+        width=container_width,
         height=container_height,
         margin=dict(l=5, r=5, t=0, b=20),
         paper_bgcolor='rgba(10, 30, 61, 0.7)',
@@ -385,8 +494,23 @@ def create_trend_graph(x_data, y_data, title, container_width=400, container_hei
         )
     )
     
+    update_trend_graph(fig, x_data, y_data, envelope, flagged)
     return fig
 
+def update_trend_graph(fig, x_data, y_data, envelope=None, flagged=None):
+    """
+    Updates a figure built by create_trend_graph in place: only the data of
+    its traces changes, sent as int32 seconds and float32 values
+    """
+    x_data = time_array(x_data)
+    y_data = value_array(y_data)
+    *threshold_traces, lo_trace, hi_trace, line_trace, flag_trace = fig.data
+    for trace in threshold_traces:
+        trace.update(x=x_data, y=np.full(len(x_data), trace.meta, dtype=VALUE_DTYPE))
+    set_envelope_band(lo_trace, hi_trace, x_data, envelope)
+    line_trace.update(x=x_data, y=y_data)
+    set_flag_markers(flag_trace, x_data, y_data, flagged)
+
 def create_risk_gauge(risk_probability, container_width=700, container_height=180):
     # Colors for risk ranges
     risk_colors = [
@@ -492,151 +616,60 @@ def create_performance_metrics_card(metrics, container_width=300, container_heig
     
     return fig
 
-def create_main_risk_trend(risk_data, x_data, container_width=800, container_height=150):
+# Risk levels of the main trend: thresholds (%) and the color of each band (Green, Yellow, Orange, Dark Red)
+RISK_BAND_THRESHOLDS = np.array([60, 80, 90])
+RISK_BAND_COLORS = np.array(['#32CD32', '#FFD700', '#FF4500', '#8B0000'])
+
+def build_risk_band_shapes():
     """
-    Creates the main risk trend visualization with discretely colored points
+    Shaded risk bands and dashed threshold lines of the main trend as layout
+    shapes spanning the whole plot width, so they never depend on the data
+    """
+    bounds = [0, *RISK_BAND_THRESHOLDS.tolist(), 100]
+    shapes = []
+    for color, low, high in zip(RISK_BAND_COLORS, bounds[:-1], bounds[1:]):
+        r, g, b = (int(c * 255) for c in hex_to_rgb(color))
+        shapes.append(dict(type='rect', xref='paper', x0=0, x1=1, yref='y', y0=low, y1=high,
+                           fillcolor=f'rgba({r}, {g}, {b}, 0.2)', line=dict(width=0), layer='below'))
+    for color, threshold in zip(RISK_BAND_COLORS, RISK_BAND_THRESHOLDS.tolist()):
+        shapes.append(dict(type='line', xref='paper', x0=0, x1=1, yref='y', y0=threshold, y1=threshold,
+                           line=dict(color=color, width=1, dash='dash'), layer='below'))
+    return tuple(shapes)
+
+# Built once per process and shared by every main trend figure
+RISK_BAND_SHAPES = build_risk_band_shapes()
+
+# Stepped colorscale mapping a band number (0-3) to its color, so the points take a numeric color array
+RISK_BAND_COLORSCALE = [[edge, color] for i, color in enumerate(RISK_BAND_COLORS.tolist())
+                        for edge in (i / len(RISK_BAND_COLORS), (i + 1) / len(RISK_BAND_COLORS))]
+
+def create_main_risk_trend(risk_data, x_data, container_width=800, container_height=150, envelope=None,
+                           flagged=None):
+    """
+    Creates the main risk trend visualization with discretely colored points.
+    `envelope` is the (min, max) band of decimated points, if any; `flagged`
+    marks the points scored from cleaned samples
     """
-    # Define colors and thresholds
-    thresholds = [60, 80, 90]
-    colors = ['#32CD32', '#FFD700', '#FF4500', '#8B0000']  # Green, Yellow, Orange, Dark Red
-    
     fig = go.Figure()
     
-    # Add shaded areas for risk levels
-    for i in range(len(thresholds)):
-        # First threshold
-        if i == 0:
-            fig.add_trace(go.Scatter(
-                x=x_data,
-                y=[thresholds[i]] * len(x_data),
-                fill=None,
-                mode='lines',
-                line=dict(color=colors[i], width=1, dash='dash'),
-                name=f"Threshold {thresholds[i]}%"
-            ))
-            
-            # Shaded area up to first threshold
-            rgb_values = hex_to_rgb(colors[i])
-            rgba_color = f'rgba({int(rgb_values[0]*255)}, {int(rgb_values[1]*255)}, {int(rgb_values[2]*255)}, 0.2)'
-            
-            fig.add_trace(go.Scatter(
-                x=x_data,
-                y=[0] * len(x_data),
-                fill='tonexty',
-                mode='none',
-                fillcolor=rgba_color,
-                showlegend=False
-            ))
-        
-        # Intermediate thresholds
-        if i < len(thresholds) - 1:
-            fig.add_trace(go.Scatter(
-                x=x_data,
-                y=[thresholds[i+1]] * len(x_data),
-                fill=None,
-                mode='lines',
-                line=dict(color=colors[i+1], width=1, dash='dash'),
-                name=f"Threshold {thresholds[i+1]}%"
-            ))
-            
-            # Shaded area between thresholds
-            rgb_values = hex_to_rgb(colors[i+1])
-            rgba_color = f'rgba({int(rgb_values[0]*255)}, {int(rgb_values[1]*255)}, {int(rgb_values[2]*255)}, 0.2)'
-            
-            fig.add_trace(go.Scatter(
-                x=x_data,
-                y=[thresholds[i]] * len(x_data),
-                fill='tonexty',
-                mode='none',
-                fillcolor=rgba_color,
-                showlegend=False
-            ))
-        
-        # Last threshold
-        if i == len(thresholds) - 1:
-            # Shaded area from last threshold
-            rgb_values = hex_to_rgb(colors[-1])
-            rgba_color = f'rgba({int(rgb_values[0]*255)}, {int(rgb_values[1]*255)}, {int(rgb_values[2]*255)}, 0.2)'
-            
-            fig.add_trace(go.Scatter(
-                x=x_data,
-                y=[100] * len(x_data),
-                fill='tonexty',
-                mode='none',
-                fillcolor=rgba_color,
-                showlegend=False
-            ))
-    
-    # Create separate traces for each color range of markers
-    # This gives discrete colors by risk level
-    
-    # Points with risk 0-60 (Green)
-    green_x = [x_data[i] for i in range(len(risk_data)) if risk_data[i] < 60]
-    green_y = [risk_data[i] for i in range(len(risk_data)) if risk_data[i] < 60]
-    if green_x:
-        fig.add_trace(go.Scatter(
-            x=green_x, 
-            y=green_y,
-            mode='markers',
-            marker=dict(size=6, color=colors[0]),
-            name="Low Risk (<60%)",
-            hovertemplate='Time: %{x}<br>Risk: %{y:.2f}%<extra></extra>',
-            showlegend=True
-        ))
-    
-    # Points with risk 60-80 (Yellow)
-    yellow_x = [x_data[i] for i in range(len(risk_data)) if 60 <= risk_data[i] < 80]
-    yellow_y = [risk_data[i] for i in range(len(risk_data)) if 60 <= risk_data[i] < 80]
-    if yellow_x:
-        fig.add_trace(go.Scatter(
-            x=yellow_x, 
-            y=yellow_y,
-            mode='markers',
-            marker=dict(size=6, color=colors[1]),
-            name="Moderate Risk (60-80%)",
-            hovertemplate='Time: %{x}<br>Risk: %{y:.2f}%<extra></extra>',
-            showlegend=True
-        ))
-    
-    # Points with risk 80-90 (Orange)
-    orange_x = [x_data[i] for i in range(len(risk_data)) if 80 <= risk_data[i] < 90]
-    orange_y = [risk_data[i] for i in range(len(risk_data)) if 80 <= risk_data[i] < 90]
-    if orange_x:
-        fig.add_trace(go.Scatter(
-            x=orange_x, 
-            y=orange_y,
-            mode='markers',
-            marker=dict(size=6, color=colors[2]),
-            name="High Risk (80-90%)",
-            hovertemplate='Time: %{x}<br>Risk: %{y:.2f}%<extra></extra>',
-            showlegend=True
-        ))
-    
-    # Points with risk 90-100 (Red)
-    red_x = [x_data[i] for i in range(len(risk_data)) if risk_data[i] >= 90]
-    red_y = [risk_data[i] for i in range(len(risk_data)) if risk_data[i] >= 90]
-    if red_x:
-        fig.add_trace(go.Scatter(
-            x=red_x, 
-            y=red_y,
-            mode='markers',
-            marker=dict(size=6, color=colors[3]),
-            name="Critical Risk (>90%)",
-            hovertemplate='Time: %{x}<br>Risk: %{y:.2f}%<extra></extra>',
-            showlegend=True
-        ))
-    
-    # Add the trend line (without markers since we add colored markers separately)
+    # Min/max band of the samples merged into each point
+    add_envelope_band(fig, 'rgba(255, 255, 255, 0.2)')
+    
+    # The trend line with its points colored by risk level, in a single trace
     fig.add_trace(go.Scatter(
-        x=x_data, 
-        y=risk_data,
-        mode='lines',
+        x=[], 
+        y=[],
+        mode='lines+markers',
         line=dict(color='white', width=2),
+        marker=dict(size=6, color=[], colorscale=RISK_BAND_COLORSCALE, cmin=0, cmax=len(RISK_BAND_COLORS)),
         name="Risk Trend",
         hovertemplate='Time: %{x}<br>Risk: %{y:.2f}%<extra></extra>',
         showlegend=False
     ))
     
+    # Points scored from samples corrected by the artifact cleaning
+    add_flag_markers(fig)
+    
     # Configure layout
     fig.update_layout(
         title={
@@ -671,122 +704,174 @@ def create_main_risk_trend(risk_data, x_data, container_width=800, container_hei
             font_size=10,
             font_family="Arial"
         ),
-        showlegend=False  # Set to True if you want to show the legend
+        showlegend=False,  # Set to True if you want to show the legend
+        # Shaded areas and thresholds for risk levels
+        shapes=RISK_BAND_SHAPES
     )
     
+    update_main_risk_trend(fig, risk_data, x_data, envelope, flagged)
     return fig
 
+def update_main_risk_trend(fig, risk_data, x_data, envelope=None, flagged=None):
+    """
+    Updates a figure built by create_main_risk_trend in place: the line, the
+    color of each point (its risk band, assigned in one np.digitize pass) and
+    the overlays, sent as int32 seconds and float32 values
+    """
+    x_data = time_array(x_data)
+    risk_data = value_array(risk_data)
+    lo_trace, hi_trace, line_trace, flag_trace = fig.data
+    set_envelope_band(lo_trace, hi_trace, x_data, envelope)
+    # Band number of every point, centered in its step of the colorscale
+    line_trace.update(x=x_data, y=risk_data,
+                      marker_color=value_array(np.digitize(risk_data, RISK_BAND_THRESHOLDS) + 0.5))
+    set_flag_markers(flag_trace, x_data, risk_data, flagged)
+
 # Function to calculate risk
 def calculate_risk(map_val, co_val, svv_val, pvv_val):
-    risk_score = 100 - min(100, max(0, (map_val - 60) + (co_val * 10) - 
-                                   (svv_val * 0.5) - (pvv_val * 0.5)))
-    return risk_score
+    # Scalar wrapper over the vectorized kernel
+    return float(calculate_risk_array(map_val, co_val, svv_val, pvv_val))
+
+# Seconds between dashboard refreshes while automatic playback is running
+PLAYBACK_FRAME_SECONDS = 0.5
+
+# Number of points kept in the trend history in manual mode
+MANUAL_TREND_CAPACITY = 100
+
+# Points kept in the trend ring buffer of a live bed (the full feed stays in the patient store)
+LIVE_TREND_CAPACITY = 3600
+
+# Points of a playback trend: when full, pairs of points merge, so the buffer covers the whole recording
+# and its size per session does not grow with the recording (the full data stays in the patient store)
+PLAYBACK_TREND_CAPACITY = 800
+
+def ensure_trend_capacity(capacity, compact=False):
+    """
+    Reallocates the session trend buffer when the required capacity (or the
+    way it makes room, merging points or dropping the oldest) changes,
+    keeping the most recent points and the statistics of the whole session
+    """
+    trend_data = st.session_state.trend_data
+    if trend_data.capacity != capacity or trend_data.compact != compact:
+        st.session_state.trend_data = trend_data.resized(capacity, compact)
+    return st.session_state.trend_data
+
+def append_manual_point():
+    """Adds the current parameter values as a new trend point (manual mode)"""
+    trend_data = ensure_trend_capacity(MANUAL_TREND_CAPACITY)
+    trend_data.append(st.session_state.simulation_time, st.session_state.map, st.session_state.co,
+                      st.session_state.svv, st.session_state.pvv,
+                      calculate_risk(st.session_state.map, st.session_state.co, st.session_state.svv, st.session_state.pvv))
+    
+    # Update x_data for charts
+    st.session_state.x_data = np.arange(len(trend_data))
 
 # Function to update data based on mode
 def update_trend_data():
     # Automatic mode: load from Excel
-    if st.session_state.mode == "AUTOMÁTICO" and 'excel_data_full' in st.session_state and st.session_state.excel_data_full is not None and st.session_state.running:
+    if st.session_state.mode == "AUTOMÁTICO" and st.session_state.patient_key is not None and st.session_state.running:
         # Find row closest to current time
         time_val = st.session_state.simulation_time
-        df = st.session_state.excel_data_full
         
         try:
-            # Check available columns in Excel
-            time_col = None
-            if 'time' in df.columns:
-                time_col = 'time'
-            elif 'tiempo' in df.columns:
-                time_col = 'tiempo'
-            elif 'Tiempo' in df.columns:
-                time_col = 'Tiempo'
-            elif 'Time' in df.columns:
-                time_col = 'Time'
+            record = patient_store.get(st.session_state.patient_key)
+        except KeyError:
+            # The bed or followed file was closed and its data released from the store
+            st.session_state.running = False
+            st.warning("The data source was closed")
+            return calculate_risk(st.session_state.map, st.session_state.co, st.session_state.svv, st.session_state.pvv)
+        
+        try:
+            # Channels are resolved once at load time, so columns are indexed by position.
+            # Take one snapshot per tick: an upload may still be streaming rows in
+            data = record.data
+            time_arr = data[TIME]
+            
+            if record.live:
+                # Live bed: every record received so far, with the clock at the newest one
+                n_rows = data.shape[1]
+                if n_rows:
+                    st.session_state.simulation_time = float(time_arr[-1])
+            else:
+                # Playback cursor: number of rows up to current time (rows are sorted by time)
+                n_rows = int(np.searchsorted(time_arr, time_val, side='right'))
+            
+            # Playback keeps the whole recording at a resolution that halves as it fills; live beds use a fixed ring
+            if record.live:
+                trend_data = ensure_trend_capacity(LIVE_TREND_CAPACITY)
+            else:
+                trend_data = ensure_trend_capacity(PLAYBACK_TREND_CAPACITY, compact=True)
+            
+            # Start over if playback went backwards or the history no longer matches the cursor
+            cursor = st.session_state.playback_cursor
+            if n_rows < cursor or trend_data.source_rows != cursor:
+                trend_data.clear()
+                cursor = 0
+            
+            if n_rows > 0:
+                last = n_rows - 1
                 
-            if time_col:
-                # Find all rows up to current time
-                max_time = df[time_col].max()
-                if time_val > max_time:
-                    time_val = max_time
+                # Current values from the cleaned channels; a NaN only survives a gap longer than the fill limit
+                for idx, name, cast in ((MAP, 'map', int), (CO, 'co', float), (SVV, 'svv', int), (PPV, 'pvv', int)):
+                    value = data[idx, last]
+                    if record.present[idx] and not np.isnan(value):
+                        st.session_state[name] = cast(value)
                 
-                # Find row corresponding to current time
-                rows_up_to_now = df[df[time_col] <= time_val]
+                # Take only the rows added since the previous tick (missing channels are NaN)
+                new_rows = slice(cursor, n_rows)
+                block = np.vstack([data[[TIME, MAP, CO, SVV, PPV], new_rows],
+                                   # Slice the new points from the precomputed risk timeline (scored directly while loading)
+                                   risk_index.rows(record, cursor, n_rows),
+                                   # Samples corrected by the artifact cleaning
+                                   record.flags[[MAP, CO, SVV, PPV], new_rows] != 0])
                 
-                if not rows_up_to_now.empty:
-                    # Take the last row for current values
-                    current_row = rows_up_to_now.iloc[-1]
-                    
-                    # Extract values if they exist
-                    if 'MAP' in current_row:
-                        st.session_state.map = int(current_row['MAP'])
-                    if 'CO' in current_row:
-                        st.session_state.co = float(current_row['CO'])
-                    if 'SVV' in current_row:
-                        st.session_state.svv = int(current_row['SVV'])
-                    if 'PVV' in current_row:
-                        st.session_state.pvv = int(current_row['PVV'])
-                    
-                    # Update trend data
-                    # Clear existing data and reload all rows up to now
-                    st.session_state.trend_data = {
-                        'time': list(rows_up_to_now[time_col]),
-                        'map': list(rows_up_to_now['MAP'] if 'MAP' in rows_up_to_now.columns else []),
-                        'co': list(rows_up_to_now['CO'] if 'CO' in rows_up_to_now.columns else []),
-                        'svv': list(rows_up_to_now['SVV'] if 'SVV' in rows_up_to_now.columns else []),
-                        'pvv': list(rows_up_to_now['PVV'] if 'PVV' in rows_up_to_now.columns else []),
-                        'risk': []
-                    }
-                    
-                    # Calculate risk for each point
-                    for i in range(len(st.session_state.trend_data['time'])):
-                        map_val = st.session_state.trend_data['map'][i] if i < len(st.session_state.trend_data['map']) else 75
-                        co_val = st.session_state.trend_data['co'][i] if i < len(st.session_state.trend_data['co']) else 5.0
-                        svv_val = st.session_state.trend_data['svv'][i] if i < len(st.session_state.trend_data['svv']) else 12
-                        pvv_val = st.session_state.trend_data['pvv'][i] if i < len(st.session_state.trend_data['pvv']) else 11
-                        
-                        risk = calculate_risk(map_val, co_val, svv_val, pvv_val)
-                        st.session_state.trend_data['risk'].append(risk)
-                    
-                    # Update x_data for charts
-                    st.session_state.x_data = list(st.session_state.trend_data['time'])
+                # Decimate before charting: a burst becomes one point per frame (last value plus min/max
+                # envelope); a rebuilt history is split as if it had been played frame by frame
+                decimator = st.session_state.frame_decimator
+                if cursor == 0:
+                    decimator.reset()
+                    frame_seconds = st.session_state.playback_clock.speed * PLAYBACK_FRAME_SECONDS
+                    last_vals, lo, hi = decimator.rebuild(block, block[0], frame_seconds)
+                else:
+                    last_vals, lo, hi = decimator.frame(block)
+                
+                # Statistics still see every source row
+                trend_data.extend(*last_vals[:6], lo=lo[:6], hi=hi[:6], source=(block[0], block[5]),
+                                  flags=hi[6:] > 0)
+                
+                # Update x_data for charts (a copy: the buffer view changes as the ring is written)
+                st.session_state.x_data = trend_data['time'].copy()
+                st.session_state.playback_cursor = n_rows
         except Exception as e:
-            st.sidebar.error(f"Error updating data: {str(e)}")
+            st.error(f"Error updating data: {str(e)}")
     else:
         # Manual mode or no Excel data: add only the current point
-        if len(st.session_state.trend_data['map']) >= 100:  # Keep up to 100 points to avoid overload
-            for key in st.session_state.trend_data:
-                if key != 'time' and st.session_state.trend_data[key]:
-                    st.session_state.trend_data[key].pop(0)
-        
-        # Add current time
-        if 'time' not in st.session_state.trend_data:
-            st.session_state.trend_data['time'] = []
-        
-        st.session_state.trend_data['time'].append(st.session_state.simulation_time)
-        
-        # Add new values
-        st.session_state.trend_data['map'].append(st.session_state.map)
-        st.session_state.trend_data['co'].append(st.session_state.co)
-        st.session_state.trend_data['svv'].append(st.session_state.svv)
-        st.session_state.trend_data['pvv'].append(st.session_state.pvv)
-        
-        # Update x_data for charts
-        st.session_state.x_data = list(range(len(st.session_state.trend_data['map'])))
+        append_manual_point()
     
     # Calculate risk based on current parameters
     risk_score = calculate_risk(st.session_state.map, st.session_state.co, st.session_state.svv, st.session_state.pvv)
     
-    # Ensure that risk array is updated
-    if len(st.session_state.trend_data['risk']) < len(st.session_state.x_data):
-        st.session_state.trend_data['risk'].append(risk_score)
-    
     return risk_score
 
+# Summary windows offered in the trend summary (minutes, None = whole session)
+SUMMARY_WINDOWS = {"All": None, "Last 10 min": 10, "Last 30 min": 30, "Last 60 min": 60}
+
 # Function to calculate trend statistics
-def calculate_trend_stats(risk_data, time_interval=0.1):
+def calculate_trend_stats(risk_stats, time_stats=None, window_minutes=None, time_interval=0.1):
     """
-    Calculate statistics for risk trend data
+    Calculate statistics for risk trend data from a streaming RiskStats accumulator
+    (a plain sequence of risk values is also accepted).
+    
+    When a TimeWeightedRiskStats is given, times and average risk integrate over the
+    real sample timestamps within the requested window; otherwise each point counts
+    as time_interval seconds. Maximum risk and trend direction cover the whole session.
     """
-    if not risk_data:
+    if not isinstance(risk_stats, RiskStats):
+        values = risk_stats
+        risk_stats = RiskStats()
+        risk_stats.extend(values)
+    
+    if risk_stats.count == 0:
         return {
             "high_risk_time": 0,
             "critical_risk_time": 0,
@@ -796,52 +881,28 @@ def calculate_trend_stats(risk_data, time_interval=0.1):
             "time_above_threshold": 0
         }
     
-    # Calculate time (in minutes) where risk > 80% (high risk)
-    high_risk_points = len([r for r in risk_data if r >= 80])
-    high_risk_time = (high_risk_points * time_interval) / 60
-    
-    # Calculate time (in minutes) where risk > 90% (critical risk)
-    critical_risk_points = len([r for r in risk_data if r >= 90])
-    critical_risk_time = (critical_risk_points * time_interval) / 60
-    
-    # Calculate average risk
-    average_risk = sum(risk_data) / len(risk_data) if risk_data else 0
-    
-    # Calculate trend direction (increasing or decreasing)
-    if len(risk_data) > 5:
-        # Compare average of first half vs second half
-        half_point = len(risk_data) // 2
-        first_half_avg = sum(risk_data[:half_point]) / half_point if half_point > 0 else 0
-        second_half_avg = sum(risk_data[half_point:]) / (len(risk_data) - half_point) if (len(risk_data) - half_point) > 0 else 0
-        
-        diff = second_half_avg - first_half_avg
-        if diff > 5:
-            trend_direction = "Strongly Increasing"
-        elif diff > 1:
-            trend_direction = "Increasing"
-        elif diff < -5:
-            trend_direction = "Strongly Decreasing"
-        elif diff < -1:
-            trend_direction = "Decreasing"
-        else:
-            trend_direction = "Stable"
-    else:
-        trend_direction = "Insufficient data"
-    
-    # Maximum risk value
-    max_risk = max(risk_data) if risk_data else 0
-    
-    # Calculate time above threshold of 65%
-    threshold_points = len([r for r in risk_data if r >= 65])
-    time_above_threshold = (threshold_points * time_interval) / 60
+    window = time_stats.window(window_minutes) if time_stats is not None else None
+    if window is not None:
+        return {
+            # Time (in minutes) where risk > 80% (high risk)
+            "high_risk_time": window['minutes_above_80'],
+            # Time (in minutes) where risk > 90% (critical risk)
+            "critical_risk_time": window['minutes_above_90'],
+            "average_risk": window['average_risk'],
+            "trend_direction": risk_stats.trend_direction(),
+            "max_risk": risk_stats.max,
+            # Time above threshold of 65%
+            "time_above_threshold": window['minutes_above_65']
+        }
     
+    # No usable timestamps (e.g. manual mode): count points
     return {
-        "high_risk_time": high_risk_time,
-        "critical_risk_time": critical_risk_time,
-        "average_risk": average_risk,
-        "trend_direction": trend_direction,
-        "max_risk": max_risk,
-        "time_above_threshold": time_above_threshold
+        "high_risk_time": (risk_stats.above[80] * time_interval) / 60,
+        "critical_risk_time": (risk_stats.above[90] * time_interval) / 60,
+        "average_risk": risk_stats.mean,
+        "trend_direction": risk_stats.trend_direction(),
+        "max_risk": risk_stats.max,
+        "time_above_threshold": (risk_stats.above[65] * time_interval) / 60
     }
 
 # Initialize session state if it doesn't exist
@@ -853,19 +914,27 @@ if 'simulation_time' not in st.session_state:
     st.session_state.co = 5.0
     st.session_state.svv = 12
     st.session_state.pvv = 11
-    st.session_state.trend_data = {
-        'time': [],
-        'map': [],
-        'co': [],
-        'svv': [],
-        'pvv': [],
-        'risk': []
-    }
+    st.session_state.trend_data = TrendBuffer(MANUAL_TREND_CAPACITY)
     st.session_state.x_data = []
     st.session_state.current_patient = None
-    st.session_state.excel_data_full = None
     st.session_state.show_metrics = False
     st.session_state.show_trend_summary = False
+if 'patient_key' not in st.session_state:
+    st.session_state.patient_key = None
+if 'playback_cursor' not in st.session_state:
+    st.session_state.playback_cursor = 0
+if 'playback_clock' not in st.session_state:
+    st.session_state.playback_clock = PlaybackClock(frame_interval=PLAYBACK_FRAME_SECONDS)
+if 'frame_decimator' not in st.session_state:
+    st.session_state.frame_decimator = FrameDecimator()
+if 'figure_registry' not in st.session_state:
+    st.session_state.figure_registry = FigureRegistry()
+if 'trend_pyramids' not in st.session_state:
+    st.session_state.trend_pyramids = PyramidCache()
+if 'payload_metrics' not in st.session_state:
+    st.session_state.payload_metrics = PayloadMetrics()
+if 'drawn_params' not in st.session_state:
+    st.session_state.drawn_params = {}
 
 # App title
 st.markdown("<h1 style='text-align: center; margin: 0; padding: 0;'>ROSphere Monitor</h1>", unsafe_allow_html=True)
@@ -908,11 +977,27 @@ with st.sidebar:
     if st.session_state.mode == "AUTOMÁTICO":
         # Patient selector
         st.markdown("<div style='margin-bottom: 3px;'>Patient</div>", unsafe_allow_html=True)
-        patient_options = [f"Patient {i}" for i in range(1, 21)]
-        selected_patient = st.selectbox("Select patient", patient_options, label_visibility="collapsed", key="patient_select")
+        # Patients listed in the catalog (simulated patients 1-20 if the data folder is missing)
+        patient_options = patient_catalog.keys() or list(range(1, 21))
+        patient_id = st.selectbox(
+            "Select patient", patient_options, label_visibility="collapsed", key="patient_select",
+            # Labels must not change while preloading: the selectbox identity depends on them
+            format_func=lambda key: f"Patient {key}"
+        )
+        # Readiness of the background preload, next to the selector
+        if not cohort_preloader.done:
+            selected_state = "ready" if cohort_preloader.is_ready(patient_id) else "loading"
+            st.caption(f"Preloading cohort: {cohort_preloader.ready_count()}/{len(cohort_preloader.status)} ready · "
+                       f"Patient {patient_id} {selected_state}")
+        if patient_id in cohort_preloader.errors:
+            st.warning(f"Patient {patient_id} could not be preloaded: {cohort_preloader.errors[patient_id]}")
         
-        # Extract patient number
-        patient_id = int(selected_patient.split()[1])
+        # Recording summary from the catalog manifest
+        patient_info = patient_catalog.info(patient_id)
+        if patient_info:
+            interval = f" · every {patient_info['interval_s']:.0f} s" if patient_info['interval_s'] else ""
+            st.caption(f"{patient_info['rows']} rows · {patient_info['duration_s'] / 60:.0f} min{interval} · "
+                       f"{len(patient_info['channels'])} channels")
         
         # Show data loading info
         data_loaded = False
@@ -929,13 +1014,8 @@ with st.sidebar:
         
         if uploaded_file is not None:
             try:
-                # Save the file to temp directory
-                file_path = os.path.join(temp_dir, uploaded_file.name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # Schedule file deletion after 10 minutes
-                delete_file_after_delay(file_path)
+                # Save the file to the upload store (deleted 10 minutes after its last use)
+                file_path = upload_store.save(uploaded_file.name, uploaded_file.getbuffer())
                 
                 # Success message
                 st.markdown(
@@ -944,48 +1024,43 @@ with st.sidebar:
                     unsafe_allow_html=True
                 )
                 
-                # If Excel or CSV, load into the data
-                if uploaded_file.name.endswith(('.xlsx', '.xls')):
-                    df = pd.read_excel(file_path)
-                    st.session_state.excel_data_full = df
-                    st.session_state.simulation_time = 0
-                    st.session_state.running = False
-                    
-                    # Reset trend data for the new dataset
-                    st.session_state.trend_data = {
-                        'time': [],
-                        'map': [],
-                        'co': [],
-                        'svv': [],
-                        'pvv': [],
-                        'risk': []
-                    }
-                    st.session_state.x_data = []
-                    
-                    # Show preview
-                    with st.expander("Preview uploaded data"):
-                        st.write(df.head())
-                    
-                elif uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                    st.session_state.excel_data_full = df
+                # Stream the file into the shared store; playback can start after the first chunk
+                upload_digest = file_digest(file_path)
+                upload_key = f"upload:{upload_digest}"
+                if upload_key not in patient_store:
+                    # A file ingested before (this or another session) is read back from the columnar cache
+                    df = load_cached_frame(file_path)
+                    if df is not None:
+                        patient_store.put(upload_key, df, upload_digest, file_path)
+                    else:
+                        patient_store.ingest(upload_key, file_path, upload_digest)
+                record = patient_store.get(upload_key)
+                
+                if st.session_state.patient_key != upload_key:
+                    st.session_state.patient_key = upload_key
                     st.session_state.simulation_time = 0
                     st.session_state.running = False
                     
                     # Reset trend data for the new dataset
-                    st.session_state.trend_data = {
-                        'time': [],
-                        'map': [],
-                        'co': [],
-                        'svv': [],
-                        'pvv': [],
-                        'risk': []
-                    }
+                    st.session_state.trend_data.clear()
                     st.session_state.x_data = []
-                    
-                    # Show preview
-                    with st.expander("Preview uploaded data"):
-                        st.write(df.head())
+                    st.session_state.playback_cursor = 0
+                
+                if record.error:
+                    st.error(f"Error loading {uploaded_file.name}: {record.error}")
+                elif not record.complete:
+                    st.progress(record.progress, text=f"Loading rows: {record.n_rows}")
+                if record.missing:
+                    st.warning(f"Missing channels: {', '.join(record.missing)}")
+                
+                # Show preview
+                with st.expander("Preview uploaded data"):
+                    st.write(record.head())
+                
+                # Upload storage usage for this server process
+                usage = upload_store.usage()
+                st.caption(f"Uploads: {usage['files']} files, {usage['bytes'] / 2**20:.1f} of "
+                           f"{usage['max_bytes'] / 2**20:.0f} MB · {usage['threads']} threads")
             
             except Exception as e:
                 st.markdown(
@@ -993,46 +1068,97 @@ with st.sidebar:
                     f"Error: {str(e)}</div>",
                     unsafe_allow_html=True
                 )
+        elif str(st.session_state.patient_key).startswith("upload:"):
+            # The upload was removed: free its data and go back to the selected patient
+            patient_store.release(st.session_state.patient_key)
+            st.session_state.current_patient = None
+        
+        # Live monitors streaming over the local feed socket, one record per bed
+        live_key = None
+        if st.checkbox("Live monitors", key="live_feed_enabled"):
+            try:
+                # A server that failed to bind raises here and is not cached, so the next rerun retries
+                feed_server = get_feed_server()
+            except OSError as e:
+                feed_server = None
+                st.error(str(e))
+        else:
+            feed_server = None
+        if feed_server is not None:
+            live_beds = feed_server.bed_names()
+            if live_beds:
+                live_key = bed_key(st.selectbox("Bed", live_beds, key="live_bed_select"))
+            else:
+                st.caption(f"Waiting for monitors on {feed_server.protocol.upper()} {feed_server.host}:{feed_server.port}")
+            feed_metrics = feed_server.metrics.snapshot()
+            if feed_metrics['records']:
+                latency = (f" · latency p50 {feed_metrics['latency_p50_ms']:.1f} ms, p95 {feed_metrics['latency_p95_ms']:.1f} ms"
+                           if 'latency_p50_ms' in feed_metrics else "")
+                st.caption(f"Feed: {feed_metrics['records']} records, {feed_metrics['records_per_s']:.0f}/s{latency}")
+        
+        # Growing monitor export, polled for changes; only the appended rows are parsed. Browsers can only
+        # pick files inside the export folder configured on the server (ROSPHERE_TAIL_DIR), or follow the
+        # file set by ROSPHERE_TAIL_PATH
+        tail_dir = os.environ.get("ROSPHERE_TAIL_DIR", "")
+        tail_path = os.environ.get("ROSPHERE_TAIL_PATH", "")
+        if tail_dir:
+            tail_name = st.text_input("Follow export file", value=os.path.basename(tail_path),
+                                      placeholder="monitor_export.csv", key="tail_path",
+                                      help=f"File in {tail_dir}").strip()
+            tail_path = os.path.realpath(os.path.join(tail_dir, tail_name)) if tail_name else ""
+            if tail_path and os.path.commonpath([tail_path, os.path.realpath(tail_dir)]) != os.path.realpath(tail_dir):
+                st.warning("Only files inside the export folder can be followed")
+                tail_path = ""
+        if tail_path and live_key is None:
+            if os.path.isfile(tail_path) and tail_path.endswith(('.csv', '.xlsx')):
+                tailer = tailer_registry.get(os.path.abspath(tail_path))
+                live_key = tailer.record.key
+                st.caption(f"Following {os.path.basename(tail_path)}: {tailer.record.n_rows} rows")
+                if tailer.record.error:
+                    st.warning(tailer.record.error)
+            else:
+                st.warning("Export file not found (expected a .csv or .xlsx file)")
+        
+        if live_key is not None and st.session_state.patient_key != live_key:
+            st.session_state.patient_key = live_key
+            st.session_state.running = False
+            
+            # Reset trend data for the bed
+            st.session_state.trend_data.clear()
+            st.session_state.x_data = []
+            st.session_state.playback_cursor = 0
+        elif live_key is None and str(st.session_state.patient_key).startswith(("bed:", "tail:")):
+            # Back from a live source: reload the selected patient
+            st.session_state.current_patient = None
         
         # If patient changed, reset simulation
-        if st.session_state.current_patient != patient_id and not uploaded_file:
+        if st.session_state.current_patient != patient_id and not uploaded_file and live_key is None:
             st.session_state.current_patient = patient_id
             st.session_state.simulation_time = 0
             st.session_state.running = False
             
-            # For demo purposes, generate random data
-            # In real app, this would load from Excel files
-            df = pd.DataFrame({
-                'time': list(range(100)),
-                'MAP': [np.random.randint(65, 95) for _ in range(100)],
-                'CO': [round(np.random.uniform(3.0, 7.0), 1) for _ in range(100)],
-                'SVV': [np.random.randint(8, 20) for _ in range(100)],
-                'PVV': [np.random.randint(7, 18) for _ in range(100)]
-            })
-            st.session_state.excel_data_full = df
+            # Load (or reuse) the patient from the shared store
+            record = patient_store.get(patient_id)
+            st.session_state.patient_key = patient_id
             data_loaded = True
             
             st.markdown(f"<div style='background-color: #0a1e3d; color: white; padding: 5px; border-radius: 5px; margin-top: 5px;'>Data loaded: {excel_file}</div>", unsafe_allow_html=True)
+            if record.missing:
+                st.warning(f"Missing channels: {', '.join(record.missing)}")
             
             # Reset trend data
-            st.session_state.trend_data = {
-                'time': [],
-                'map': [],
-                'co': [],
-                'svv': [],
-                'pvv': [],
-                'risk': []
-            }
+            st.session_state.trend_data.clear()
             st.session_state.x_data = []
+            st.session_state.playback_cursor = 0
         
         st.markdown("<hr>", unsafe_allow_html=True)
         
-        # Show simulation time
-        st.markdown(f"""
-        <div class='timer-display'>
-            ⏱️ Time: {st.session_state.simulation_time:.1f} seconds
-        </div>
-        """, unsafe_allow_html=True)
+        # Playback speed (multiple of real time)
+        playback_clock = st.session_state.playback_clock
+        playback_speed = st.select_slider("Playback speed", options=PLAYBACK_SPEEDS, value=playback_clock.speed,
+                                          format_func=lambda speed: f"{speed}×", key="playback_speed")
+        if playback_speed != playback_clock.speed:
+            playback_clock.set_speed(playback_speed)
         
         # Control buttons
         col1, col2 = st.columns(2)
@@ -1049,75 +1175,19 @@ with st.sidebar:
         else:
             status = "Simulation stopped"
         st.markdown(f"<div style='color: #A0A0A0; margin-top: 5px;'>{status}</div>", unsafe_allow_html=True)
-    
-    # Always show parameter controls
-    st.markdown("<hr>", unsafe_allow_html=True)
-    st.markdown("<div style='margin-bottom: 2px;'>Simulation Parameters</div>", unsafe_allow_html=True)
-    
-    # Only allow editing in manual mode
-    disabled = st.session_state.mode != "MANUAL"
-    
-    # First row of parameters
-    param_col1, param_col2 = st.columns(2)
-    
-    with param_col1:
-        # MAP control
-        st.markdown("<div class='param-box'>MAP (mmHg)</div>", unsafe_allow_html=True)
-        
-        # Numeric input
-        map_val = st.number_input("MAP input", min_value=40, max_value=140, value=int(st.session_state.map), 
-                                  step=1, label_visibility="collapsed", key="map_num", disabled=disabled)
-        
-        # Slider
-        st.session_state.map = st.slider("MAP slider", 40, 140, int(map_val), 1, 
-                                        label_visibility="collapsed", key="map_slider", disabled=disabled)
-        
-        st.markdown(f"<div class='slider-value'>{st.session_state.map}</div>", unsafe_allow_html=True)
-    
-    with param_col2:
-        # CO control
-        st.markdown("<div class='param-box'>CO (L/min)</div>", unsafe_allow_html=True)
-        
-        # Numeric input
-        co_val = st.number_input("CO input", min_value=1.0, max_value=10.0, value=float(st.session_state.co), 
-                                step=0.1, format="%.1f", label_visibility="collapsed", key="co_num", disabled=disabled)
-        
-        # Slider
-        st.session_state.co = st.slider("CO slider", 1.0, 10.0, float(co_val), 0.1, 
-                                      label_visibility="collapsed", key="co_slider", disabled=disabled)
-        
-        st.markdown(f"<div class='slider-value'>{st.session_state.co:.1f}</div>", unsafe_allow_html=True)
-    
-    # Second row of parameters
-    param_col3, param_col4 = st.columns(2)
-    
-    with param_col3:
-        # SVV control
-        st.markdown("<div class='param-box'>SVV (%)</div>", unsafe_allow_html=True)
-        
-        # Numeric input
-        svv_val = st.number_input("SVV input", min_value=0, max_value=25, value=int(st.session_state.svv), 
-                                 step=1, label_visibility="collapsed", key="svv_num", disabled=disabled)
         
-        # Slider
-        st.session_state.svv = st.slider("SVV slider", 0, 25, int(svv_val), 1, 
-                                       label_visibility="collapsed", key="svv_slider", disabled=disabled)
-        
-        st.markdown(f"<div class='slider-value'>{st.session_state.svv}</div>", unsafe_allow_html=True)
-    
-    with param_col4:
-        # PVV control
-        st.markdown("<div class='param-box'>PVV (%)</div>", unsafe_allow_html=True)
-        
-        # Numeric input
-        pvv_val = st.number_input("PVV input", min_value=0, max_value=25, value=int(st.session_state.pvv), 
-                                 step=1, label_visibility="collapsed", key="pvv_num", disabled=disabled)
-        
-        # Slider
-        st.session_state.pvv = st.slider("PVV slider", 0, 25, int(pvv_val), 1, 
-                                       label_visibility="collapsed", key="pvv_slider", disabled=disabled)
-        
-        st.markdown(f"<div class='slider-value'>{st.session_state.pvv}</div>", unsafe_allow_html=True)
+        # Current recording resampled on a uniform grid (computed once per recording, step and method)
+        export_record = patient_store.get(st.session_state.patient_key) if st.session_state.patient_key in patient_store else None
+        if export_record is not None and not export_record.live and export_record.complete and export_record.n_rows:
+            with st.expander("Export on a uniform grid"):
+                grid_step = st.number_input("Grid step (s)", min_value=1, value=int(NOMINAL_INTERVAL_SECONDS), key="grid_step")
+                grid_method = st.radio("Resampling", RESAMPLE_METHODS, horizontal=True, key="grid_method",
+                                       format_func=lambda method: "Last value" if method == "locf" else "Linear")
+                grid, block, names = resample_index.get(export_record, float(grid_step), grid_method)
+                grid_frame = pd.DataFrame(block.T, columns=names)
+                grid_frame.insert(0, "time", grid)
+                st.download_button("Download CSV", grid_frame.to_csv(index=False), mime="text/csv",
+                                   file_name=f"{str(export_record.key).replace(':', '_')}_grid.csv")
 
 # Update simulation button in main area (only visible in automatic mode)
 if st.session_state.mode == "AUTOMÁTICO":
@@ -1133,14 +1203,110 @@ metrics = {
     "Accuracy": "0.89"
 }
 
-# Calculate current risk
-risk_score = update_trend_data()
+def trend_envelope(field):
+    """Min/max band of a trend channel, only when some points merge several samples"""
+    trend_data = st.session_state.trend_data
+    return trend_data.envelope(field) if trend_data.is_decimated() else None
+
+def trend_flags(field):
+    """Points of a trend channel built from samples corrected by the artifact cleaning"""
+    return st.session_state.trend_data.flagged(field)
+
+# Points sent to the browser per trend trace (about one per pixel of the chart)
+TREND_POINT_BUDGET = 400
+MAIN_TREND_POINT_BUDGET = 800
+
+# Gauge thresholds of each trend; crossings are always kept when a trend is downsampled
+TREND_THRESHOLDS = {'risk': (60, 80, 90), 'map': (65, 95), 'co': (2.5, 7.5), 'svv': (8, 17), 'pvv': (5, 15)}
+
+def trend_x():
+    """X values of the trend points (simulation time, or the point number in manual mode)"""
+    x_data, n_points = st.session_state.x_data, len(st.session_state.trend_data)
+    # x_data lags the trend for a frame after a reset or a mode switch
+    return np.asarray(x_data) if len(x_data) == n_points else np.arange(n_points)
+
+def trend_view(field, budget, trend_range=None):
+    """
+    Points of a trend channel to draw: LTTB-downsampled to `budget` over the
+    visible range, resolved from the session's pyramid of the channel (extended
+    with the new points each frame, rebuilt only when the trend is reset or
+    drops old points). Returns (x, y, envelope, flagged)
+    """
+    trend_data = st.session_state.trend_data
+    x_data, y_data = trend_x(), trend_data[field]
+    series_key = (st.session_state.patient_key, trend_data.generation)
+    pyramid = st.session_state.trend_pyramids.get(field, series_key, x_data, y_data, TREND_THRESHOLDS[field])
+    idx = pyramid.view(*(trend_range or (None, None)), budget=budget)
+    envelope = trend_envelope(field)
+    if envelope is not None:
+        envelope = (envelope[0][idx], envelope[1][idx])
+    return x_data[idx], y_data[idx], envelope, trend_flags(field)[idx]
+
+def session_figure(name, build):
+    """Persistent figure of the current patient or bed: `build()` runs once, later frames update it in place"""
+    return st.session_state.figure_registry.get(st.session_state.patient_key, name, build)
+
+def show_chart(name, fig, target=None):
+    """Sends a figure to the browser (in `target`, a placeholder, if given) and counts its payload on sampled frames"""
+    st.session_state.payload_metrics.add(name, fig)
+    (target or st).plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
-# Create containers for main metrics row
-row3_col1, row3_col2 = st.columns([1, 2])
+def payload_fragment(render, **kwargs):
+    """
+    st.fragment of `render` whose runs are payload frames: a fragment rerun on
+    its own closes its own frame, a nested one adds to the enclosing fragment's
+    """
+    @functools.wraps(render)
+    def run(*args, **run_kwargs):
+        with st.session_state.payload_metrics.frame():
+            return render(*args, **run_kwargs)
+    return st.fragment(run, **kwargs)
+
+# Channel panels: trend field -> (title, gauge range)
+CHANNEL_PANELS = {'map': ("MAP (mmHg)", 40, 140), 'co': ("CO (L/min)", 1, 10),
+                  'svv': ("SVV (%)", 0, 25), 'pvv': ("PVV (%)", 0, 25)}
+
+# Placeholders of the gauges in the current page, so the parameter controls can redraw just those
+dashboard_slots = {}
+
+def draw_channel_gauge(field):
+    """Draws a channel gauge with the current parameter value into its placeholder"""
+    title, min_val, max_val = CHANNEL_PANELS[field]
+    value = st.session_state[field]
+    gauge = session_figure(f'{field}_gauge', lambda: create_gauge_chart(
+        value=value,
+        title="",
+        min_val=min_val,
+        max_val=max_val,
+        thresholds=list(TREND_THRESHOLDS[field])
+    ))
+    update_gauge_chart(gauge, value)
+    show_chart(f'{field}_gauge', gauge, dashboard_slots[f'{field}_gauge'])
+    st.session_state.drawn_params[field] = value
+
+def draw_risk_gauge():
+    """Draws the risk gauge for the current parameter values into its placeholder"""
+    risk_score = calculate_risk(st.session_state.map, st.session_state.co, st.session_state.svv, st.session_state.pvv)
+    risk_gauge = session_figure('risk_gauge', lambda: create_risk_gauge(risk_score))
+    update_gauge_chart(risk_gauge, risk_score)
+    show_chart('risk_gauge', risk_gauge, dashboard_slots['risk_gauge'])
+
+def draw_main_trend(trend_range=None):
+    """Draws the main risk trend over `trend_range` into its placeholder"""
+    main_trend_chart = session_figure('main_trend', lambda: create_main_risk_trend([], []))
+    risk_x, risk_y, risk_envelope, risk_flagged = trend_view('risk', MAIN_TREND_POINT_BUDGET, trend_range)
+    update_main_risk_trend(main_trend_chart, risk_y, risk_x, envelope=risk_envelope, flagged=risk_flagged)
+    show_chart('main_trend', main_trend_chart, dashboard_slots['main_trend'])
 
-# Metrics row
-with row3_col1:
+def draw_channel_trend(field, trend_range=None):
+    """Draws a channel trend over `trend_range` into its placeholder"""
+    title = CHANNEL_PANELS[field][0]
+    trend = session_figure(f'{field}_trend', lambda: create_trend_graph([], [], title=title))
+    update_trend_graph(trend, *trend_view(field, TREND_POINT_BUDGET, trend_range))
+    show_chart(f'{field}_trend', trend, dashboard_slots[f'{field}_trend'])
+
+def render_metrics_card():
+    """Algorithm metrics card and its dialog"""
     # Clickable card for Algorithm Metrics
     st.markdown("""
     <div class="clickable-card" id="metrics-card">
@@ -1148,12 +1314,12 @@ with row3_col1:
         <div class="card-subtitle">Click to view detailed performance metrics</div>
     </div>
     """, unsafe_allow_html=True)
-    
+
     # Create button to toggle metrics display (hidden but functional for the card)
     metrics_btn = st.button("Show Metrics", key="show_metrics_btn", label_visibility="collapsed")
     if metrics_btn:
         st.session_state.show_metrics = not st.session_state.show_metrics
-    
+
     # Display metrics dialog if button was clicked
     if st.session_state.show_metrics:
         st.markdown("""
@@ -1164,7 +1330,7 @@ with row3_col1:
             </div>
             <div class="modal-body">
         """, unsafe_allow_html=True)
-        
+    
         # Display metrics in the modal
         for metric, value in metrics.items():
             st.markdown(f"""
@@ -1173,14 +1339,15 @@ with row3_col1:
                 <div class="stat-value">{value}</div>
             </div>
             """, unsafe_allow_html=True)
-        
+    
         st.markdown("</div></div>", unsafe_allow_html=True)
-        
+    
         # Button to close the modal
         if st.button("Close", key="close_metrics_btn"):
             st.session_state.show_metrics = False
 
-with row3_col2:
+def render_risk_gauge():
+    """Risk gauge region"""
     # Risk gauge title with clickable card
     st.markdown("""
     <div class="clickable-card" id="risk-card">
@@ -1188,45 +1355,44 @@ with row3_col2:
         <div class="card-subtitle">Current Risk Assessment</div>
     </div>
     """, unsafe_allow_html=True)
-    
+
     # Show risk gauge with probability
-    risk_gauge = create_risk_gauge(risk_score)
-    risk_chart_placeholder = st.empty()
-    risk_chart_placeholder.plotly_chart(risk_gauge, use_container_width=True, config={'displayModeBar': False})
+    dashboard_slots['risk_gauge'] = st.empty()
+    draw_risk_gauge()
 
-# Main risk trend chart section with clickable button for summary
-if len(st.session_state.trend_data['risk']) > 0:
+def render_main_trend(trend_range=None):
+    """Main risk trend region with its summary dialog"""
     # Container for main trend chart
     st.markdown("<div class='main-trend-container'>", unsafe_allow_html=True)
-    
+
     # Create button to toggle trend summary
     trend_summary_col1, trend_summary_col2 = st.columns([5, 1])
-    
+
     with trend_summary_col2:
         st.markdown("""
         <div class="clickable-card" id="trend-summary-card" style="margin-top: 0; padding: 8px 5px;">
             <div class="card-title" style="font-size: 14px; margin-bottom: 0">Trend Summary</div>
         </div>
         """, unsafe_allow_html=True)
-        
+    
         # Hidden button for trend summary
         summary_btn = st.button("Show Summary", key="show_summary_btn", label_visibility="collapsed")
         if summary_btn:
             st.session_state.show_trend_summary = not st.session_state.show_trend_summary
-    
+
     # Create and display main trend chart
-    main_trend_chart = create_main_risk_trend(
-        st.session_state.trend_data['risk'],
-        st.session_state.x_data if st.session_state.x_data else list(range(len(st.session_state.trend_data['risk'])))
-    )
-    
-    st.plotly_chart(main_trend_chart, use_container_width=True, config={'displayModeBar': False})
-    
+    dashboard_slots['main_trend'] = st.empty()
+    draw_main_trend(trend_range)
+
     # Display trend summary if button was clicked
     if st.session_state.show_trend_summary:
-        # Calculate trend statistics
-        trend_stats = calculate_trend_stats(st.session_state.trend_data['risk'])
-        
+        # Calculate trend statistics over the selected window
+        summary_window = st.radio("Summary window", list(SUMMARY_WINDOWS), horizontal=True,
+                                  label_visibility="collapsed", key="summary_window")
+        trend_stats = calculate_trend_stats(st.session_state.trend_data.risk_stats,
+                                            st.session_state.trend_data.time_stats,
+                                            SUMMARY_WINDOWS[summary_window])
+    
         st.markdown("""
         <div class="modal-dialog">
             <div class="modal-header">
@@ -1235,145 +1401,251 @@ if len(st.session_state.trend_data['risk']) > 0:
             </div>
             <div class="modal-body">
         """, unsafe_allow_html=True)
-        
+    
         # Display trend statistics
         st.markdown(f"""
         <div class="stat-box">
             <div class="stat-label">Time with Risk >80%</div>
             <div class="stat-value">{trend_stats['high_risk_time']:.2f} min</div>
         </div>
-        
+    
         <div class="stat-box">
             <div class="stat-label">Time with Risk >90%</div>
             <div class="stat-value">{trend_stats['critical_risk_time']:.2f} min</div>
         </div>
-        
+    
         <div class="stat-box">
             <div class="stat-label">Average Risk</div>
             <div class="stat-value">{trend_stats['average_risk']:.1f}%</div>
         </div>
-        
+    
         <div class="stat-box">
             <div class="stat-label">Maximum Risk</div>
             <div class="stat-value">{trend_stats['max_risk']:.1f}%</div>
         </div>
-        
+    
         <div class="stat-box">
             <div class="stat-label">Trend Direction</div>
             <div class="stat-value">{trend_stats['trend_direction']}</div>
         </div>
-        
+    
         <div class="stat-box">
             <div class="stat-label">Time with Risk >65%</div>
             <div class="stat-value">{trend_stats['time_above_threshold']:.2f} min</div>
         </div>
         """, unsafe_allow_html=True)
-        
+    
         st.markdown("</div></div>", unsafe_allow_html=True)
-        
+    
         # Button to close the modal
         if st.button("Close", key="close_summary_btn"):
             st.session_state.show_trend_summary = False
-    
+
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Create containers for main parameter charts rows
-row1_col1, row1_col2 = st.columns(2)
-row2_col1, row2_col2 = st.columns(2)
+def render_channel_panel(field, trend_range=None):
+    """Gauge and trend chart of one channel"""
+    title = CHANNEL_PANELS[field][0]
+    # Channel with navy blue title
+    st.markdown(f"<div class='metric-title'>{title}</div>", unsafe_allow_html=True)
+    dashboard_slots[f'{field}_gauge'] = st.empty()
+    draw_channel_gauge(field)
 
-# First row of charts
-with row1_col1:
-    # MAP with navy blue title
-    st.markdown("<div class='metric-title'>MAP (mmHg)</div>", unsafe_allow_html=True)
-    map_gauge = create_gauge_chart(
-        value=st.session_state.map,
-        title="",
-        min_val=40,
-        max_val=140,
-        thresholds=[65, 95]
-    )
-    st.plotly_chart(map_gauge, use_container_width=True, config={'displayModeBar': False})
-    
-    # MAP trend chart with scrolling
-    st.markdown("<div class='scrollable-chart'>", unsafe_allow_html=True)
-    map_trend = create_trend_graph(
-        x_data=st.session_state.x_data,
-        y_data=st.session_state.trend_data['map'],
-        title="MAP (mmHg)",
-        scrollable=True
-    )
-    st.plotly_chart(map_trend, use_container_width=True, config={'displayModeBar': False})
-    st.markdown("</div>", unsafe_allow_html=True)
+    dashboard_slots[f'{field}_trend'] = st.empty()
+    draw_channel_trend(field, trend_range)
 
-with row1_col2:
-    # CO with navy blue title
-    st.markdown("<div class='metric-title'>CO (L/min)</div>", unsafe_allow_html=True)
-    co_gauge = create_gauge_chart(
-        value=st.session_state.co,
-        title="",
-        min_val=1,
-        max_val=10,
-        thresholds=[2.5, 7.5]
-    )
-    st.plotly_chart(co_gauge, use_container_width=True, config={'displayModeBar': False})
-    
-    # CO trend chart with scrolling
-    st.markdown("<div class='scrollable-chart'>", unsafe_allow_html=True)
-    co_trend = create_trend_graph(
-        x_data=st.session_state.x_data,
-        y_data=st.session_state.trend_data['co'],
-        title="CO (L/min)",
-        scrollable=True
-    )
-    st.plotly_chart(co_trend, use_container_width=True, config={'displayModeBar': False})
-    st.markdown("</div>", unsafe_allow_html=True)
+def parameter_controls():
+    """
+    Parameter controls of the sidebar. A change reruns only this fragment: in
+    manual mode the new point is added to the trend, and the trends, the gauges
+    whose value changed and the risk gauge are redrawn in place
+    """
+    # Always show parameter controls
+    st.markdown("<hr>", unsafe_allow_html=True)
+    st.markdown("<div style='margin-bottom: 2px;'>Simulation Parameters</div>", unsafe_allow_html=True)
+    
+    # Only allow editing in manual mode
+    disabled = st.session_state.mode != "MANUAL"
+    
+    # First row of parameters
+    param_col1, param_col2 = st.columns(2)
+    
+    with param_col1:
+        # MAP control
+        st.markdown("<div class='param-box'>MAP (mmHg)</div>", unsafe_allow_html=True)
+        
+        # Numeric input
+        map_val = st.number_input("MAP input", min_value=40, max_value=140, value=int(st.session_state.map), 
+                                  step=1, label_visibility="collapsed", key="map_num", disabled=disabled)
+        
+        # Slider (it drives the value only in manual mode; playback sets it otherwise)
+        map_set = st.slider("MAP slider", 40, 140, int(map_val), 1, 
+                           label_visibility="collapsed", key="map_slider", disabled=disabled)
+        if not disabled:
+            st.session_state.map = map_set
+        
+        st.markdown(f"<div class='slider-value'>{st.session_state.map}</div>", unsafe_allow_html=True)
+    
+    with param_col2:
+        # CO control
+        st.markdown("<div class='param-box'>CO (L/min)</div>", unsafe_allow_html=True)
+        
+        # Numeric input
+        co_val = st.number_input("CO input", min_value=1.0, max_value=10.0, value=float(st.session_state.co), 
+                                step=0.1, format="%.1f", label_visibility="collapsed", key="co_num", disabled=disabled)
+        
+        # Slider (it drives the value only in manual mode; playback sets it otherwise)
+        co_set = st.slider("CO slider", 1.0, 10.0, float(co_val), 0.1, 
+                         label_visibility="collapsed", key="co_slider", disabled=disabled)
+        if not disabled:
+            st.session_state.co = co_set
+        
+        st.markdown(f"<div class='slider-value'>{st.session_state.co:.1f}</div>", unsafe_allow_html=True)
+    
+    # Second row of parameters
+    param_col3, param_col4 = st.columns(2)
+    
+    with param_col3:
+        # SVV control
+        st.markdown("<div class='param-box'>SVV (%)</div>", unsafe_allow_html=True)
+        
+        # Numeric input
+        svv_val = st.number_input("SVV input", min_value=0, max_value=25, value=int(st.session_state.svv), 
+                                 step=1, label_visibility="collapsed", key="svv_num", disabled=disabled)
+        
+        # Slider (it drives the value only in manual mode; playback sets it otherwise)
+        svv_set = st.slider("SVV slider", 0, 25, int(svv_val), 1, 
+                          label_visibility="collapsed", key="svv_slider", disabled=disabled)
+        if not disabled:
+            st.session_state.svv = svv_set
+        
+        st.markdown(f"<div class='slider-value'>{st.session_state.svv}</div>", unsafe_allow_html=True)
+    
+    with param_col4:
+        # PVV control
+        st.markdown("<div class='param-box'>PVV (%)</div>", unsafe_allow_html=True)
+        
+        # Numeric input
+        pvv_val = st.number_input("PVV input", min_value=0, max_value=25, value=int(st.session_state.pvv), 
+                                 step=1, label_visibility="collapsed", key="pvv_num", disabled=disabled)
+        
+        # Slider (it drives the value only in manual mode; playback sets it otherwise)
+        pvv_set = st.slider("PVV slider", 0, 25, int(pvv_val), 1, 
+                          label_visibility="collapsed", key="pvv_slider", disabled=disabled)
+        if not disabled:
+            st.session_state.pvv = pvv_set
+        
+        st.markdown(f"<div class='slider-value'>{st.session_state.pvv}</div>", unsafe_allow_html=True)
+    
+    # Manual mode: redraw only what the change affects. The new point is added to every trend, so all
+    # of them are redrawn; of the gauges, only those whose value changed and the risk gauge
+    if st.session_state.mode == "MANUAL" and dashboard_slots:
+        changed = [field for field in CHANNEL_PANELS if st.session_state.drawn_params.get(field) != st.session_state[field]]
+        if changed:
+            append_manual_point()
+            if 'main_trend' in dashboard_slots:
+                draw_main_trend()
+            for field in CHANNEL_PANELS:
+                draw_channel_trend(field)
+            for field in changed:
+                draw_channel_gauge(field)
+            draw_risk_gauge()
 
-# Second row of charts
-with row2_col1:
-    # SVV with navy blue title
-    st.markdown("<div class='metric-title'>SVV (%)</div>", unsafe_allow_html=True)
-    svv_gauge = create_gauge_chart(
-        value=st.session_state.svv,
-        title="",
-        min_val=0,
-        max_val=25,
-        thresholds=[8, 17]
-    )
-    st.plotly_chart(svv_gauge, use_container_width=True, config={'displayModeBar': False})
-    
-    # SVV trend chart with scrolling
-    st.markdown("<div class='scrollable-chart'>", unsafe_allow_html=True)
-    svv_trend = create_trend_graph(
-        x_data=st.session_state.x_data,
-        y_data=st.session_state.trend_data['svv'],
-        title="SVV (%)",
-        scrollable=True
-    )
-    st.plotly_chart(svv_trend, use_container_width=True, config={'displayModeBar': False})
-    st.markdown("</div>", unsafe_allow_html=True)
+def render_dashboard():
+    """
+    Renders the risk gauge, trend charts and parameter panels. While automatic
+    playback runs this is the only part of the page refreshed on each frame;
+    each region inside it is a nested fragment that its own widgets rerun alone.
+    """
+    record = patient_store.get(st.session_state.patient_key) if st.session_state.patient_key in patient_store else None
+    live = record is not None and record.live
+    
+    # Advance the playback clock; frames missed while rendering are skipped (live beds follow the feed instead)
+    playback_clock = st.session_state.playback_clock
+    playback_ended = False
+    if st.session_state.mode == "AUTOMÁTICO" and st.session_state.running and not live:
+        # A fully loaded recording ends at its last timestamp (an upload still streaming in keeps going)
+        end_time = float(record.data[TIME][-1]) if record is not None and record.complete and record.n_rows else None
+        if not playback_clock.running:
+            playback_clock.start(st.session_state.simulation_time if end_time is None else min(st.session_state.simulation_time, end_time))
+        st.session_state.simulation_time = playback_clock.tick(end_time)
+        playback_ended = not playback_clock.running
+    elif playback_clock.running:
+        playback_clock.stop()
+    
+    if st.session_state.mode == "AUTOMÁTICO" and live:
+        # Live bed: show the bed and how many records it has sent
+        st.markdown(f"""
+        <div class='timer-display'>
+            🔴 Live: {record.key} · {record.n_rows} records
+        </div>
+        """, unsafe_allow_html=True)
+    elif st.session_state.mode == "AUTOMÁTICO":
+        # Show simulation time
+        st.markdown(f"""
+        <div class='timer-display'>
+            ⏱️ Time: {st.session_state.simulation_time:.1f} seconds ({playback_clock.speed}×, {playback_clock.frames_skipped} frames skipped)
+        </div>
+        """, unsafe_allow_html=True)
 
-with row2_col2:
-    # PVV with navy blue title
-    st.markdown("<div class='metric-title'>PVV (%)</div>", unsafe_allow_html=True)
-    pvv_gauge = create_gauge_chart(
-        value=st.session_state.pvv,
-        title="",
-        min_val=0,
-        max_val=25,
-        thresholds=[5, 15]
-    )
-    st.plotly_chart(pvv_gauge, use_container_width=True, config={'displayModeBar': False})
-    
-    # PVV trend chart with scrolling
-    st.markdown("<div class='scrollable-chart'>", unsafe_allow_html=True)
-    pvv_trend = create_trend_graph(
-        x_data=st.session_state.x_data,
-        y_data=st.session_state.trend_data['pvv'],
-        title="PVV (%)",
-        scrollable=True
-    )
-    st.plotly_chart(pvv_trend, use_container_width=True, config={'displayModeBar': False})
-    st.markdown("</div>", unsafe_allow_html=True)
+        # Uploads keep streaming in while playback runs over the rows already loaded
+        if record is not None and not record.complete:
+            st.caption(f"Loading patient data… {record.n_rows} rows ({record.progress:.0%})")
+
+    # Add the new points to the trend (the gauges read the current values from the session)
+    update_trend_data()
+    
+    # Decimation counters: source rows that arrived for this frame and rows merged into another point
+    if st.session_state.mode == "AUTOMÁTICO" and st.session_state.running:
+        decimator = st.session_state.frame_decimator
+        st.caption(f"Rows this frame: {decimator.batch_rows} (max {decimator.max_batch_rows}) · "
+                   f"{decimator.merged_rows} rows merged")
+        # Bytes of chart specs sent per fragment run (binary float32/int32 arrays), measured on sampled runs
+        payload = st.session_state.payload_metrics.snapshot()
+        if payload['frames']:
+            st.caption(f"Chart payload: {payload['last_frame_bytes'] / 1024:.1f} kB last sampled frame · "
+                       f"{payload['average_frame_bytes'] / 1024:.1f} kB average (1 in {payload['sample_every']} frames)")
+
+    # Zoom to the latest minutes of the trend (same windows as the summary); each view is resolved
+    # from the cached pyramids, so switching windows never resends the full-resolution series
+    trend_range = None
+    if st.session_state.mode == "AUTOMÁTICO" and len(st.session_state.trend_data):
+        trend_window = st.radio("Trend window", list(SUMMARY_WINDOWS), horizontal=True, key="trend_window")
+        range_x = trend_x()
+        if SUMMARY_WINDOWS[trend_window] is not None and len(range_x):
+            trend_range = (float(range_x[-1]) - SUMMARY_WINDOWS[trend_window] * 60, float(range_x[-1]))
+
+    # Each region is a fragment of its own: its buttons rerun only that region, and all of them
+    # rerun together with the dashboard on each playback frame
+    row3_col1, row3_col2 = st.columns([1, 2])
+    with row3_col1:
+        payload_fragment(render_metrics_card)()
+    with row3_col2:
+        payload_fragment(render_risk_gauge)()
+
+    # Main risk trend chart section with clickable button for summary
+    if len(st.session_state.trend_data['risk']) > 0:
+        payload_fragment(render_main_trend)(trend_range)
+
+    # Create containers for main parameter charts rows
+    row1_col1, row1_col2 = st.columns(2)
+    row2_col1, row2_col2 = st.columns(2)
+    for column, field in zip((row1_col1, row1_col2, row2_col1, row2_col2), CHANNEL_PANELS):
+        with column:
+            payload_fragment(render_channel_panel)(field, trend_range)
+
+    # End of the recording: stop playback and rerun the page so the dashboard stops refreshing
+    if playback_ended:
+        st.session_state.running = False
+        st.rerun()
+
+# Only the dashboard reruns on each playback frame, not the whole script
+playback_interval = PLAYBACK_FRAME_SECONDS if st.session_state.mode == "AUTOMÁTICO" and st.session_state.running else None
+payload_fragment(render_dashboard, run_every=playback_interval)()
+
+# Parameter controls last: by then the dashboard has created the gauge placeholders they redraw
+with st.sidebar:
+    payload_fragment(parameter_controls)()
 
 # Add JavaScript for clickable cards
 st.markdown("""
@@ -1427,14 +1699,3 @@ st.markdown("""
     });
 </script>
 """, unsafe_allow_html=True)
-
-# Automatic simulation (only run in automatic mode and when running)
-if st.session_state.mode == "AUTOMÁTICO" and st.session_state.running:
-    # Increment simulation time
-    st.session_state.simulation_time += 0.1
-    
-    # Short pause for more realistic simulation
-    time.sleep(0.1)
-    
-    # Use st.rerun() to update the page
-    st.rerun()
\ No newline at end of file
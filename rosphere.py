@@ -0,0 +1,27 @@
+"""
+ROSphere command line tools
+
+Usage:
+    python rosphere.py replay [--data-dir DIR] [--out-dir DIR] [--workers N] [--grid SECONDS] [patient ...]
+    python rosphere.py feed {simulate,bench} PATIENT [--rate N] [--udp] [--port N] [--bed NAME]
+"""
+import sys
+
+COMMANDS = ('replay', 'feed')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        return 2
+    if argv[0] == 'replay':
+        from utils.replay import main as replay_main
+        return replay_main(argv[1:])
+    if argv[0] == 'feed':
+        from utils.live_feed import main as feed_main
+        return feed_main(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
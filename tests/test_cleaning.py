@@ -0,0 +1,39 @@
+import numpy as np
+from utils.cleaning import SignalCleaner, FLAG_OUT_OF_RANGE, FLAG_SPIKE
+from utils.schema import CHANNELS, CHANNEL_INDEX, TIME
+
+
+def noisy_block(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = np.full((len(CHANNELS), n_rows), np.nan, dtype=np.float32)
+    data[TIME] = np.arange(n_rows) * 20.0
+    data[CHANNEL_INDEX['MAP']] = rng.normal(75, 3, n_rows)
+    data[CHANNEL_INDEX['CO']] = rng.normal(5, 0.3, n_rows)
+    data[CHANNEL_INDEX['SVV']] = rng.normal(10, 1, n_rows)
+    # Artefactos: valores fuera de rango, picos aislados y huecos
+    data[CHANNEL_INDEX['MAP'], rng.choice(n_rows, 10, replace=False)] = 400
+    data[CHANNEL_INDEX['CO'], rng.choice(n_rows, 10, replace=False)] = 15
+    data[CHANNEL_INDEX['SVV'], rng.choice(n_rows, 30, replace=False)] = np.nan
+    return data
+
+
+def test_chunked_cleaning_matches_a_single_pass():
+    data = noisy_block(500)
+    whole_values, whole_flags = SignalCleaner().clean(data)
+    cleaner = SignalCleaner()
+    parts = [cleaner.clean(data[:, start:stop]) for start, stop in ((0, 1), (1, 7), (7, 180), (180, 333), (333, 500))]
+    values = np.concatenate([part[0] for part in parts], axis=1)
+    flags = np.concatenate([part[1] for part in parts], axis=1)
+    np.testing.assert_array_equal(values, whole_values)
+    np.testing.assert_array_equal(flags, whole_flags)
+
+
+def test_artifacts_are_flagged_and_removed():
+    data = noisy_block(200, seed=3)
+    values, flags = SignalCleaner().clean(data)
+    map_row = CHANNEL_INDEX['MAP']
+    assert np.all(flags[map_row, data[map_row] == 400] & FLAG_OUT_OF_RANGE)
+    assert not np.any(values[map_row] == 400)
+    co_row = CHANNEL_INDEX['CO']
+    spikes = data[co_row] == 15
+    assert np.all(flags[co_row, spikes] & FLAG_SPIKE)
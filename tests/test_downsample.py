@@ -0,0 +1,40 @@
+import numpy as np
+from utils.downsample import LttbPyramid
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = 60 + 30 * np.sin(x / 50) + rng.normal(0, 5, n)
+    y[rng.random(n) < 0.02] = np.nan
+    return x, y
+
+
+def test_incremental_extend_matches_a_full_build():
+    x, y = series(5000)
+    full = LttbPyramid(x, y, (60, 80), base_points=32)
+    grown = LttbPyramid(x[:0], y[:0], (60, 80), base_points=32)
+    rng = np.random.default_rng(1)
+    n = 0
+    while n < len(x):
+        n = min(len(x), n + int(rng.integers(1, 400)))
+        grown.extend(x[:n], y[:n])
+    assert len(grown.levels) == len(full.levels)
+    for grown_level, full_level in zip(grown.levels, full.levels):
+        np.testing.assert_array_equal(grown_level, full_level)
+    np.testing.assert_array_equal(grown.keep, full.keep)
+    np.testing.assert_array_equal(grown.view(budget=300), full.view(budget=300))
+
+
+def test_view_fits_the_budget_and_keeps_both_ends():
+    x, y = series(20000, seed=2)
+    pyramid = LttbPyramid(x, y, (60, 80), base_points=32)
+    assert len(pyramid.keep) > 100
+    for x_min, x_max in ((None, None), (x[10], x[15000]), (x[1] - 0.1, x[-2] + 0.1)):
+        for budget in (2, 5, 50, 400):
+            idx = pyramid.view(x_min, x_max, budget)
+            lo = 0 if x_min is None else np.searchsorted(x, x_min)
+            hi = len(x) - 1 if x_max is None else np.searchsorted(x, x_max, side='right') - 1
+            assert len(idx) <= budget
+            assert idx[0] == lo and idx[-1] == hi
+            assert np.all(np.diff(idx) > 0)
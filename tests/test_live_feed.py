@@ -0,0 +1,35 @@
+import json
+import numpy as np
+from utils.live_feed import FeedServer
+from utils.patient_store import PatientStore
+
+COMPLETE = {'Time': 20, 'MAP': 58, 'CO': 2.1, 'SVV': 19, 'PPV': 18}
+
+
+def lines(*records):
+    return [json.dumps(record).encode('utf-8') for record in records]
+
+
+def test_channel_missing_from_the_first_record_is_picked_up_later():
+    server = FeedServer(PatientStore())
+    server.feed(lines({'Time': 0, 'MAP': 60, 'bed': 'late'}))
+    record = server.bed('late')
+    assert not record.has('CO')
+    assert 'CO' in record.missing
+    server.feed(lines(dict(COMPLETE, bed='late')))
+    assert record.has('CO') and record.has('SVV') and record.has('PPV')
+    assert record.missing == []
+
+    # El riesgo de la fila completa es el mismo que el de una cama que la recibe sola
+    server.feed(lines(dict(COMPLETE, bed='complete')))
+    assert np.isclose(server.last_risk['late'], server.last_risk['complete'])
+
+
+
+def test_bed_names_are_a_snapshot():
+    server = FeedServer(PatientStore())
+    server.feed(lines({'Time': 0, 'MAP': 60, 'bed': 'b'}, {'Time': 0, 'MAP': 60, 'bed': 'a'}))
+    names = server.bed_names()
+    server.feed(lines({'Time': 0, 'MAP': 60, 'bed': 'c'}))
+    assert names == ['a', 'b']
+    assert server.bed_names() == ['a', 'b', 'c']
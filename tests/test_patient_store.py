@@ -0,0 +1,76 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from utils.patient_store import PatientStore
+from utils.risk_index import RiskTimelineIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'HEMODINAMICA')
+
+
+def patient_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Time': np.arange(n_rows) * 20.0,
+        'MAP': rng.uniform(60, 90, n_rows),
+        'CO': rng.uniform(3, 6, n_rows),
+        'SVV': rng.uniform(5, 15, n_rows),
+        'PPV': rng.uniform(5, 15, n_rows),
+    })
+
+
+def test_keys_with_the_same_content_share_one_record():
+    store = PatientStore(DATA_DIR)
+    first = store.put('upload:a', patient_frame(50), 'digest-1')
+    second = store.put('upload:b', patient_frame(50), 'digest-1')
+    assert first is second
+    assert store.nbytes() == first.nbytes()
+
+
+def test_concurrent_cold_gets_share_one_load():
+    store = PatientStore(DATA_DIR)
+    records = []
+    threads = [threading.Thread(target=lambda: records.append(store.get(1))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(records) == 4
+    assert len({id(record) for record in records}) == 1
+    assert store.get(1) is records[0]
+
+
+def test_least_recently_used_records_are_evicted():
+    store = PatientStore(DATA_DIR)
+    size = store.put('upload:probe', patient_frame(100, seed=9), 'probe').nbytes()
+    store.release('upload:probe')
+    store.max_bytes = 2 * size
+    store.put('upload:a', patient_frame(100, seed=1), 'a')
+    store.put('upload:b', patient_frame(100, seed=2), 'b')
+    # Usar 'a' la deja como la más reciente: al llegar 'c' sale 'b'
+    store.get('upload:a')
+    store.put('upload:c', patient_frame(100, seed=3), 'c')
+    assert 'upload:a' in store and 'upload:c' in store
+    assert 'upload:b' not in store
+    assert store.evictions == 1
+    assert store.nbytes() <= store.max_bytes
+
+
+def test_released_source_key_is_not_looked_up_in_the_folder():
+    store = PatientStore(DATA_DIR)
+    store.put('upload:a', patient_frame(10), 'a')
+    store.release('upload:a')
+    with pytest.raises(KeyError):
+        store.get('upload:a')
+
+
+def test_risk_timelines_are_dropped_with_their_record():
+    store = PatientStore(DATA_DIR)
+    index = RiskTimelineIndex(cache_dir=None)
+    store.add_forget_hook(index.forget)
+    record = store.put('upload:a', patient_frame(30), None)
+    index.get(record)
+    assert len(index._timelines) == 1
+    store.release('upload:a')
+    assert not index._timelines
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from utils.patient_store import PatientStore, PatientRecord
+from utils.resample import ResampleIndex
+from utils.schema import normalize_frame
+
+
+def patient_frame(n_rows):
+    return pd.DataFrame({
+        'Time': np.arange(n_rows) * 20.0,
+        'MAP': np.linspace(60, 90, n_rows),
+        'CO': np.linspace(3, 6, n_rows),
+    })
+
+
+def test_grids_are_cached_per_content_step_and_method():
+    index = ResampleIndex(max_grids=2)
+    record = PatientRecord('1', patient_frame(30), 'digest-1')
+    twin = PatientRecord('2', patient_frame(30), 'digest-1')
+    grid, block, names = index.get(record, 60.0)
+    assert index.get(twin, 60.0)[1] is block
+    assert index.hits == 1 and index.misses == 1
+    assert grid[0] == 0 and grid[-1] == 540 and names[:2] == ['MAP', 'CO']
+    index.get(record, 60.0, 'linear')
+    index.get(record, 30.0)
+    assert len(index) == 2
+    assert index.get(record, 60.0)[1] is not block
+
+
+def test_growing_record_is_resampled_again():
+    index = ResampleIndex()
+    record = PatientRecord('bed:1', live=True)
+    record.append(normalize_frame(patient_frame(10), 'bed'))
+    first = index.get(record, 20.0)[0]
+    record.append(normalize_frame(patient_frame(20).iloc[10:], 'bed', row_offset=10))
+    assert len(index.get(record, 20.0)[0]) == len(first) + 10
+
+
+def test_grids_are_dropped_with_the_record():
+    store = PatientStore()
+    index = ResampleIndex()
+    store.add_forget_hook(index.forget)
+    record = store.put('upload:a', patient_frame(30), 'digest-1')
+    index.get(record, 60.0)
+    store.release('upload:a')
+    assert len(index) == 0
@@ -0,0 +1,19 @@
+from utils.patient_store import PatientStore
+from utils.tail import TailerRegistry, tail_key
+
+
+def test_registry_stops_evicted_tailers(tmp_path):
+    store = PatientStore(str(tmp_path))
+    registry = TailerRegistry(store, max_tailers=2, poll_interval=60)
+    paths = [str(tmp_path / f"export{i}.csv") for i in range(3)]
+    tailers = [registry.get(path) for path in paths]
+    assert registry.get(paths[2]) is tailers[2]
+    assert len(registry) == 2
+    tailers[0]._thread.join(timeout=5)
+    assert not tailers[0]._thread.is_alive()
+    assert tail_key(paths[0]) not in store
+    assert tail_key(paths[2]) in store
+    registry.close()
+    for tailer in tailers:
+        tailer._thread.join(timeout=5)
+        assert not tailer._thread.is_alive()
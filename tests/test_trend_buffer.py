@@ -0,0 +1,35 @@
+import numpy as np
+from utils.trend_buffer import TrendBuffer
+
+
+def samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    time = np.arange(n) * 20.0
+    values = rng.uniform(0, 100, (5, n))
+    return time, values
+
+
+def test_compact_buffer_covers_the_whole_history():
+    time, values = samples(5000)
+    buffer = TrendBuffer(64, compact=True)
+    for start in range(0, 5000, 37):
+        buffer.extend(time[start:start + 37], *values[:, start:start + 37])
+    assert len(buffer) <= 64
+    assert buffer.source_rows == 5000
+    # El primer punto funde las muestras desde el principio del registro
+    assert buffer.envelope('time')[0][0] == time[0]
+    assert buffer['time'][-1] == time[-1]
+    assert buffer.is_decimated()
+    # El envolvente de los puntos fundidos cubre todas las muestras de origen
+    lo, hi = buffer.envelope('risk')
+    assert np.isclose(lo.min(), values[4].min(), atol=1e-3)
+    assert np.isclose(hi.max(), values[4].max(), atol=1e-3)
+    assert buffer.risk_stats.count == 5000
+
+
+def test_ring_buffer_keeps_only_the_latest_points():
+    time, values = samples(500)
+    buffer = TrendBuffer(100)
+    buffer.extend(time, *values)
+    np.testing.assert_array_equal(buffer['time'], time[-100:])
+    assert not buffer.is_decimated()
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Directorio por defecto de la caché columnar (se puede cambiar con ROSPHERE_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.environ.get(
+    'ROSPHERE_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'rosphere')
+)
+
+# Tamaño máximo de la caché en disco antes de expulsar entradas (LRU)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Memoria de hashes por (ruta, mtime, tamaño) para no releer el archivo en cada carga
+_digest_memo = {}
+
+
+def file_digest(file_path):
+    """Devuelve el hash de contenido de un archivo, memorizado por ruta y mtime"""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def _entry_paths(digest, cache_dir):
+    base = os.path.join(cache_dir, digest)
+    return base + '.npy', base + '.json'
+
+
+def load_cached_frame(file_path, cache_dir=None):
+    """Lee el DataFrame desde la caché columnar; devuelve None si no hay entrada vigente"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    try:
+        digest = file_digest(file_path)
+        npy_path, meta_path = _entry_paths(digest, cache_dir)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Una fila del array por columna: cada canal queda contiguo en disco
+        block = np.load(npy_path)
+        # Marcar el acceso para la política LRU
+        os.utime(npy_path)
+    except (OSError, ValueError):
+        return None
+    return pd.DataFrame(block.T, columns=meta['columns'], copy=False)
+
+
+def numeric_frame(df, source=''):
+    """Columnas numéricas de un DataFrame como float32, el mismo marco que devuelve la caché
+
+    Cada columna pasa por la conversión de normalize_frame (los textos
+    sueltos quedan en NaN); las columnas sin ningún valor numérico no se
+    pueden cachear, se descartan y se avisa de ellas.
+    """
+    names, arrays, dropped = [], [], []
+    for column in df.columns:
+        values = pd.to_numeric(df[column], errors='coerce')
+        if values.notna().any() or df[column].isna().all():
+            names.append(str(column))
+            arrays.append(values.to_numpy(dtype=np.float32, na_value=np.nan))
+        else:
+            dropped.append(str(column))
+    if dropped:
+        label = f" de {source}" if source else ""
+        print(f"Aviso: columnas no numéricas descartadas{label}: {', '.join(dropped)}")
+    block = np.vstack(arrays) if arrays else np.empty((0, len(df)), dtype=np.float32)
+    return pd.DataFrame(block.T, columns=names, copy=False)
+
+
+def store_frame(file_path, df, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Guarda un DataFrame numérico como bloque float32 columnar; devuelve True si se guardó"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    try:
+        block = np.ascontiguousarray(df.to_numpy(dtype=np.float32, na_value=np.nan).T)
+    except (TypeError, ValueError) as e:
+        # Columnas no numéricas: pasar antes el marco por numeric_frame
+        print(f"No se pudo cachear {file_path} (columnas no numéricas): {e}")
+        return False
+    try:
+        digest = file_digest(file_path)
+        _write_entry(digest, block, {'columns': [str(c) for c in df.columns],
+                                     'source': os.path.abspath(file_path),
+                                     'rows': int(block.shape[1])}, cache_dir)
+        evict_lru(cache_dir, max_bytes)
+        return True
+    except OSError as e:
+        print(f"No se pudo escribir la caché para {file_path}: {e}")
+        return False
+
+
+def _write_entry(name, block, meta, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    npy_path, meta_path = _entry_paths(name, cache_dir)
+    # Escritura atómica para que otra sesión nunca lea una entrada a medias
+    tmp_npy = npy_path + '.tmp.npy'
+    np.save(tmp_npy, block)
+    os.replace(tmp_npy, npy_path)
+    tmp_meta = meta_path + '.tmp'
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+
+def load_cached_array(name, cache_dir=None):
+    """Lee un array derivado (p. ej. una línea temporal de riesgo) guardado con store_array"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    npy_path, _ = _entry_paths(name, cache_dir)
+    try:
+        arr = np.load(npy_path)
+        os.utime(npy_path)
+    except (OSError, ValueError):
+        return None
+    return arr
+
+
+def store_array(name, arr, meta=None, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Guarda un array derivado en la caché bajo un nombre; comparte el límite LRU con los libros"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    try:
+        _write_entry(name, np.ascontiguousarray(arr), meta or {}, cache_dir)
+        evict_lru(cache_dir, max_bytes)
+        return True
+    except OSError as e:
+        print(f"No se pudo escribir la entrada {name} en la caché: {e}")
+        return False
+
+
+def evict_lru(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Elimina las entradas menos usadas hasta que la caché quepa en max_bytes"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.npy') or name.endswith('.tmp.npy'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        for victim in (path, path[:-len('.npy')] + '.json'):
+            try:
+                os.remove(victim)
+            except OSError:
+                pass
+        total -= size
+
+
+def read_cached_excel(file_path, cache_dir=None):
+    """Lee un libro Excel usando la caché columnar; en frío lo convierte una sola vez
+
+    Los dos caminos devuelven el mismo marco: columnas numéricas en float32.
+    """
+    df = load_cached_frame(file_path, cache_dir)
+    if df is None:
+        df = numeric_frame(pd.read_excel(file_path), file_path)
+        store_frame(file_path, df, cache_dir)
+    return df
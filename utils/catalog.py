@@ -0,0 +1,136 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from utils.cache import DEFAULT_CACHE_DIR, file_digest
+from utils.schema import CHANNELS, TIME
+
+MANIFEST_VERSION = 1
+
+
+def patient_key(stem):
+    """Clave de paciente a partir del nombre del archivo (1.xlsx -> 1)"""
+    return int(stem) if stem.isdigit() else stem
+
+
+def _sort_key(key):
+    # Orden numérico cuando los nombres son números (1, 2, ..., 20)
+    return (isinstance(key, str), key if isinstance(key, int) else 0, str(key))
+
+
+def describe_record(record):
+    """Resumen de un registro para el manifiesto: filas, duración, canales e intervalo"""
+    time_arr = record.channel(TIME)
+    time_arr = time_arr[~np.isnan(time_arr)] if time_arr is not None else np.empty(0)
+    steps = np.diff(time_arr)
+    return {
+        'rows': int(record.n_rows),
+        'duration_s': float(time_arr[-1] - time_arr[0]) if len(time_arr) > 1 else 0.0,
+        'interval_s': float(np.median(steps)) if len(steps) else None,
+        'channels': [name for name, ok in zip(CHANNELS, record.present) if ok],
+    }
+
+
+class PatientCatalog:
+    """Catálogo de los libros de pacientes, direccionado por contenido
+
+    Cada archivo se identifica por el hash de su contenido, así las copias
+    idénticas comparten una sola entrada (se parsean y se cachean una vez).
+    El manifiesto en disco guarda por archivo (tamaño, mtime, hash) y por
+    contenido (filas, duración, canales, intervalo): al arrancar solo se
+    vuelven a hashear los archivos que cambiaron.
+    """
+
+    def __init__(self, data_dir='data/HEMODINAMICA', manifest_path=None):
+        self.data_dir = data_dir
+        if manifest_path is None:
+            tag = hashlib.sha1(os.path.abspath(data_dir).encode('utf-8')).hexdigest()[:12]
+            manifest_path = os.path.join(DEFAULT_CACHE_DIR, f"catalog-{tag}.json")
+        self.manifest_path = manifest_path
+        # nombre de archivo -> {'size', 'mtime_ns', 'digest'}
+        self.files = {}
+        # hash de contenido -> metadatos (describe_record)
+        self.contents = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get('version') != MANIFEST_VERSION:
+            return
+        self.files = manifest.get('files', {})
+        self.contents = manifest.get('contents', {})
+
+    def save(self):
+        """Escribe el manifiesto de forma atómica"""
+        with self._lock:
+            manifest = {'version': MANIFEST_VERSION, 'files': dict(self.files), 'contents': dict(self.contents)}
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def scan(self):
+        """Actualiza el catálogo con los .xlsx de la carpeta; solo hashea los archivos nuevos o cambiados"""
+        files = {}
+        changed = False
+        if os.path.isdir(self.data_dir):
+            for entry in os.scandir(self.data_dir):
+                if not entry.name.endswith('.xlsx') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                known = self.files.get(entry.name)
+                if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    files[entry.name] = known
+                    continue
+                files[entry.name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                     'digest': file_digest(entry.path)}
+                changed = True
+        changed = changed or files.keys() != self.files.keys()
+        with self._lock:
+            self.files = files
+            # Los contenidos sin ningún archivo dejan de listarse
+            live = {meta['digest'] for meta in files.values()}
+            self.contents = {digest: info for digest, info in self.contents.items() if digest in live}
+        if changed:
+            self.save()
+        return self
+
+    def keys(self):
+        """Claves de paciente en orden de selector"""
+        return sorted((patient_key(os.path.splitext(name)[0]) for name in self.files), key=_sort_key)
+
+    def path(self, key):
+        return os.path.join(self.data_dir, f"{key}.xlsx")
+
+    def digest(self, key):
+        meta = self.files.get(f"{key}.xlsx")
+        return meta['digest'] if meta else None
+
+    def info(self, key):
+        """Metadatos del contenido de un paciente, o None si aún no se ha descrito"""
+        return self.contents.get(self.digest(key))
+
+    def unique(self):
+        """Un paciente representante por contenido distinto: {hash: [claves con ese contenido]}"""
+        groups = {}
+        for key in self.keys():
+            groups.setdefault(self.digest(key), []).append(key)
+        return groups
+
+    def record(self, digest, record):
+        """Guarda en el manifiesto la descripción de un contenido ya cargado"""
+        if digest is None or digest in self.contents:
+            return
+        with self._lock:
+            self.contents[digest] = describe_record(record)
+
+    def missing(self):
+        """Hashes que todavía no tienen descripción en el manifiesto"""
+        return [digest for digest in self.unique() if digest not in self.contents]
@@ -0,0 +1,119 @@
+import warnings
+import numpy as np
+from utils.schema import CHANNELS, CHANNEL_INDEX, TIME
+
+# Rangos fisiológicos plausibles; fuera de ellos el valor es un artefacto
+PHYSIOLOGIC_RANGES = {
+    'MAP': (20, 200),
+    'CO': (0.5, 20),
+    'SVV': (0, 50),
+    'PPV': (0, 50),
+    'HR': (20, 250),
+    'SV': (5, 250),
+    'SBP': (30, 300),
+    'DBP': (10, 200),
+}
+
+# Desviación mínima respecto a la mediana para considerar un pico (unidades del canal);
+# evita marcar como picos los cambios pequeños cuando la señal es casi plana (MAD ≈ 0)
+SPIKE_FLOORS = {'MAP': 15, 'CO': 1.5, 'SVV': 6, 'PPV': 6, 'HR': 25}
+
+# Ventana de la mediana móvil (muestras, incluida la actual) y umbral en MADs
+SPIKE_WINDOW = 7
+SPIKE_MADS = 5.0
+
+# Hueco máximo (s) que se rellena con el último valor válido
+MAX_FILL_SECONDS = 60
+
+# Banderas de calidad por muestra (bits)
+FLAG_MISSING = 1        # la fuente no traía valor
+FLAG_OUT_OF_RANGE = 2   # valor fuera del rango fisiológico
+FLAG_SPIKE = 4          # pico rechazado por la mediana/MAD móvil
+FLAG_FILLED = 8         # valor rellenado con el último válido
+
+_LOW = np.full(len(CHANNELS), -np.inf, dtype=np.float32)
+_HIGH = np.full(len(CHANNELS), np.inf, dtype=np.float32)
+for _name, (_low, _high) in PHYSIOLOGIC_RANGES.items():
+    _LOW[CHANNEL_INDEX[_name]] = _low
+    _HIGH[CHANNEL_INDEX[_name]] = _high
+
+_SPIKE_ROWS = np.array([CHANNEL_INDEX[name] for name in SPIKE_FLOORS])
+_SPIKE_FLOOR = np.array([SPIKE_FLOORS[name] for name in SPIKE_FLOORS], dtype=np.float32)
+
+
+class SignalCleaner:
+    """Limpieza vectorizada de artefactos, bloque a bloque y con estado entre bloques
+
+    Para cada bloque (canal x fila, orden de CHANNELS): descarta valores fuera
+    de rango, rechaza picos frente a la mediana/MAD de una ventana móvil
+    hacia atrás (sin mirar al futuro, válida para datos en vivo; si la muestra
+    anterior también se alejaba es un cambio de nivel y no un pico), y rellena
+    con el último valor válido los huecos de hasta `max_fill` segundos. Las
+    últimas muestras y el último valor válido de cada canal se guardan, así
+    un registro cargado por partes se limpia igual que de una vez.
+    """
+
+    __slots__ = ('max_fill', '_history', '_last_far', '_last_value', '_last_time')
+
+    def __init__(self, max_fill=MAX_FILL_SECONDS):
+        self.max_fill = max_fill
+        self._history = np.full((len(_SPIKE_ROWS), SPIKE_WINDOW - 1), np.nan, dtype=np.float32)
+        self._last_far = np.zeros(len(_SPIKE_ROWS), dtype=bool)
+        self._last_value = np.full(len(CHANNELS), np.nan, dtype=np.float32)
+        self._last_time = np.full(len(CHANNELS), np.nan, dtype=np.float32)
+
+    def clean(self, data):
+        """Devuelve (valores limpios float32, banderas uint8), ambos canal x fila"""
+        n_rows = data.shape[1]
+        missing = np.isnan(data)
+        with np.errstate(invalid='ignore'):
+            out_of_range = ~missing & ((data < _LOW[:, None]) | (data > _HIGH[:, None]))
+        values = np.where(out_of_range, np.nan, data).astype(np.float32)
+
+        # Picos: distancia a la mediana móvil mayor que SPIKE_MADS desviaciones robustas
+        spike = np.zeros_like(missing)
+        if n_rows:
+            signal = np.concatenate([self._history, values[_SPIKE_ROWS]], axis=1)
+            windows = np.lib.stride_tricks.sliding_window_view(signal, SPIKE_WINDOW, axis=1)
+            with warnings.catch_warnings():
+                # Ventanas sin ningún valor: la mediana queda en NaN y no se marca nada
+                warnings.simplefilter('ignore', RuntimeWarning)
+                median = np.nanmedian(windows, axis=2)
+                mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+            enough = np.count_nonzero(~np.isnan(windows), axis=2) >= 3
+            with np.errstate(invalid='ignore'):
+                threshold = SPIKE_MADS * 1.4826 * mad + _SPIKE_FLOOR[:, None]
+                far = enough & (np.abs(values[_SPIKE_ROWS] - median) > threshold)
+            # Solo la primera muestra alejada es pico; las siguientes confirman un cambio de nivel
+            previous_far = np.concatenate([self._last_far[:, None], far[:, :-1]], axis=1)
+            spike[_SPIKE_ROWS] = far & ~previous_far
+            self._last_far = far[:, -1]
+            values[spike] = np.nan
+            self._history = np.concatenate([self._history, values[_SPIKE_ROWS]], axis=1)[:, -(SPIKE_WINDOW - 1):]
+
+        # Relleno hacia delante: índice de la última muestra válida de cada posición
+        valid = ~np.isnan(values)
+        valid[TIME] = True
+        positions = np.where(valid, np.arange(n_rows), -1)
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        carried = positions >= 0
+        rows = np.arange(len(CHANNELS))[:, None]
+        safe = np.maximum(positions, 0)
+        time_arr = data[TIME]
+        fill_value = np.where(carried, values[rows, safe], self._last_value[:, None])
+        fill_time = np.where(carried, time_arr[safe], self._last_time[:, None])
+        with np.errstate(invalid='ignore'):
+            filled = ~valid & ~np.isnan(fill_value) & (time_arr[None, :] - fill_time <= self.max_fill)
+        values[filled] = fill_value[filled]
+
+        if n_rows:
+            last_valid = positions[:, -1]
+            has_valid = last_valid >= 0
+            self._last_value[has_valid] = values[has_valid, last_valid[has_valid]]
+            self._last_time[has_valid] = time_arr[last_valid[has_valid]]
+
+        flags = (missing * FLAG_MISSING | out_of_range * FLAG_OUT_OF_RANGE
+                 | spike * FLAG_SPIKE | filled * FLAG_FILLED).astype(np.uint8)
+        flags[TIME] = 0
+        values[TIME] = data[TIME]
+        return values, flags
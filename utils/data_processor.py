@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 import numpy as np
+from utils.cache import read_cached_excel
+from utils.risk import predict_sto2_array
 
 def create_simulated_data():
     """Crea datos simulados para demostración"""
@@ -14,8 +16,17 @@ def create_simulated_data():
     })
     return df
 
+def read_patient_data(patient_id, folder_path='data/HEMODINAMICA'):
+    """Lee el libro de un paciente; lanza una excepción si falta o no se puede leer (nunca simula datos)"""
+    file_path = os.path.join(folder_path, f"{patient_id}.xlsx")
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"No existe el libro del paciente {patient_id}: {file_path}")
+    # Lee desde la caché columnar; solo la primera carga parsea el Excel. El marco se
+    # normaliza una sola vez, al crear el PatientRecord, para que `missing` vea las columnas de origen
+    return read_cached_excel(file_path)
+
 def load_patient_data(patient_id, folder_path='data/HEMODINAMICA'):
-    """Carga los datos de un paciente o genera datos simulados"""
+    """Carga los datos de un paciente o genera datos simulados (la demo de la app sin carpeta de datos)"""
     try:
         # Verificar si el directorio existe
         if not os.path.exists(folder_path):
@@ -27,56 +38,14 @@ def load_patient_data(patient_id, folder_path='data/HEMODINAMICA'):
             print(f"¡Archivo {file_path} no encontrado! Creando datos simulados.")
             return create_simulated_data()
             
-        df = pd.read_excel(file_path)
+        df = read_patient_data(patient_id, folder_path)
         print(f"Datos del paciente {patient_id} cargados correctamente")
-        
-        # Verificar columnas necesarias
-        required_columns = ['MAP', 'CO', 'SVV', 'PPV', 'tiempo_segundos']
-        for col in required_columns:
-            if col not in df.columns:
-                if col == 'MAP':
-                    df[col] = np.random.normal(75, 10, size=len(df))
-                elif col == 'CO':
-                    df[col] = np.random.normal(5, 1, size=len(df))
-                elif col == 'SVV':
-                    df[col] = np.random.normal(12, 3, size=len(df))
-                elif col == 'PPV':
-                    df[col] = np.random.normal(11, 3, size=len(df))
-                elif col == 'tiempo_segundos':
-                    df[col] = [20 * i for i in range(len(df))]
-        
-        # Redondear valores a enteros
-        for col in ['MAP', 'CO', 'SVV', 'PPV']:
-            if col in df.columns:
-                df[col] = df[col].round(0).astype(int)
-        
         return df
     except Exception as e:
         print(f"Error al cargar datos: {e}")
         return create_simulated_data()
 
-def predict_sto2(map_val, co_val, svv_val, pvv_val):
+def predict_sto2(map_val, co_val, svv_val, pvv_val, rng=None):
     """Predice la probabilidad de StO2 <65% en 10 minutos"""
-    # Factores de riesgo según rangos
-    map_risk = 0
-    if map_val < 65: map_risk = 0.4
-    elif map_val < 70: map_risk = 0.2
-    elif map_val > 100: map_risk = 0.3
-    
-    co_risk = 0
-    if co_val < 2.5: co_risk = 0.4
-    elif co_val < 4.0: co_risk = 0.2
-    elif co_val > 8.0: co_risk = 0.3
-    
-    svv_risk = 0
-    if svv_val > 17: svv_risk = 0.3
-    elif svv_val > 13: svv_risk = 0.15
-    
-    pvv_risk = 0
-    if pvv_val > 15: pvv_risk = 0.3
-    elif pvv_val > 12: pvv_risk = 0.15
-    
-    # Calcular probabilidad final
-    risk = (map_risk * 0.35) + (co_risk * 0.35) + (svv_risk * 0.15) + (pvv_risk * 0.15)
-    risk += np.random.normal(0, 0.05)  # Añadir variabilidad
-    return min(1.0, max(0.0, risk)) * 100  # Devolver como porcentaje
\ No newline at end of file
+    # Envoltorio escalar sobre el kernel vectorizado
+    return float(predict_sto2_array(map_val, co_val, svv_val, pvv_val, rng))
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def coalesce(block, starts):
+    """Reduce columnas consecutivas de un bloque (canal x fila) a min/max/último por grupo
+
+    `starts` son los índices de inicio de cada grupo (el primero debe ser 0).
+    Devuelve (último, mínimo, máximo), cada uno canal x grupos; los NaN se
+    ignoran en el mínimo y el máximo mientras el grupo tenga algún valor.
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    ends = np.append(starts[1:], block.shape[1]) - 1
+    with np.errstate(invalid='ignore'):
+        lo = np.fmin.reduceat(block, starts, axis=1)
+        hi = np.fmax.reduceat(block, starts, axis=1)
+    return block[:, ends], lo, hi
+
+
+def frame_starts(time_arr, width):
+    """Inicios de los grupos al repartir las filas en frames de `width` segundos de tiempo simulado"""
+    if len(time_arr) == 0:
+        return np.empty(0, dtype=np.intp)
+    if not width or width <= 0:
+        return np.arange(len(time_arr))
+    frames = np.floor(np.nan_to_num(time_arr, nan=0.0) / width)
+    return np.flatnonzero(np.concatenate(([True], np.diff(frames) != 0)))
+
+
+class FrameDecimator:
+    """Etapa entre la ingesta y las gráficas: como máximo un punto por frame de render
+
+    Todas las filas que llegan entre dos frames (una ráfaga del feed o varios
+    segundos de reproducción acelerada) se funden en un punto con su último
+    valor y su envolvente mínimo/máximo; los datos completos siguen en el
+    almacén. Cuenta las filas recibidas en cada frame (y el máximo visto) y
+    las filas que se funden en el punto de otra en lugar de tener el suyo.
+    """
+
+    __slots__ = ('frames', 'rows', 'merged_rows', 'batch_rows', 'max_batch_rows')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.rows = 0
+        self.merged_rows = 0
+        self.batch_rows = 0
+        self.max_batch_rows = 0
+
+    def frame(self, block):
+        """Funde las filas pendientes en un solo punto (último, mínimo, máximo)"""
+        return self._take(block, np.zeros(1, dtype=np.intp) if block.shape[1] else np.empty(0, dtype=np.intp))
+
+    def rebuild(self, block, time_arr, width):
+        """Reconstruye un historial como si se hubiera reproducido frame a frame (`width` s por frame)"""
+        return self._take(block, frame_starts(time_arr, width))
+
+    def _take(self, block, starts):
+        count = block.shape[1]
+        self.batch_rows = count
+        self.max_batch_rows = max(self.max_batch_rows, count)
+        if count == 0:
+            empty = block[:, :0]
+            return empty, empty, empty
+        self.frames += len(starts)
+        self.rows += count
+        # Cada grupo conserva una fila como punto; las demás se funden en él
+        self.merged_rows += count - len(starts)
+        return coalesce(block, starts)
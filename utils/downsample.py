@@ -0,0 +1,221 @@
+import numpy as np
+
+# Puntos máximos por nivel más grueso de la pirámide
+PYRAMID_BASE_POINTS = 256
+
+
+def lttb_indices(x, y, budget):
+    """Índices de los puntos que conserva Largest-Triangle-Three-Buckets para `budget` puntos
+
+    Se conservan el primer y el último punto; el resto se reparte en
+    `budget - 2` cubos y de cada uno se toma el punto que forma el triángulo
+    de mayor área con sus vecinos, lo que mantiene picos y valles. Para
+    vectorizar todos los cubos a la vez, el vértice izquierdo es la media del
+    cubo anterior (no el punto elegido en él, que obligaría a recorrerlos en
+    orden). Los NaN no se eligen salvo que el cubo no tenga otra cosa.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if budget >= n or n <= 2:
+        return np.arange(n)
+    budget = max(budget, 3)
+    # Cubos del tramo interior [1, n - 1)
+    starts = np.unique(np.linspace(1, n - 1, budget - 1).astype(np.intp)[:-1])
+    counts = np.diff(np.append(starts, n - 1))
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    inner = slice(1, n - 1)
+    valid = ~np.isnan(y[inner])
+    filled = np.where(valid, y[inner], 0.0)
+    n_valid = np.add.reduceat(valid.astype(np.float64), starts - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.add.reduceat(x[inner], starts - 1) / counts
+        mean_y = np.add.reduceat(filled, starts - 1) / n_valid
+    # Vértices: media del cubo anterior y del siguiente (los extremos fijos en los bordes)
+    left_x = np.concatenate(([x[0]], mean_x[:-1]))
+    left_y = np.concatenate(([y[0]], mean_y[:-1]))
+    right_x = np.concatenate((mean_x[1:], [x[-1]]))
+    right_y = np.concatenate((mean_y[1:], [y[-1]]))
+    ax, ay, cx, cy = left_x[bucket], left_y[bucket], right_x[bucket], right_y[bucket]
+    with np.errstate(invalid='ignore'):
+        area = np.abs((ax - cx) * (y[inner] - ay) - (ax - x[inner]) * (cy - ay))
+    area = np.where(np.isnan(area), -1.0, area)
+    # Máximo por cubo: orden por (cubo, área) y último de cada cubo
+    order = np.lexsort((area, bucket))
+    chosen = order[np.cumsum(counts) - 1] + 1
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def crossing_indices(y, thresholds):
+    """Índices de las muestras en las que la serie cruza alguno de los umbrales (la muestra de después)"""
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) < 2 or not thresholds:
+        return np.empty(0, dtype=np.intp)
+    with np.errstate(invalid='ignore'):
+        above = y[:, None] >= np.asarray(thresholds, dtype=np.float64)[None, :]
+    return np.flatnonzero(np.any(above[1:] != above[:-1], axis=1)) + 1
+
+
+def pair_lttb(x, y, first=0):
+    """LTTB con cubos fijos de dos puntos consecutivos: posición elegida en cada cubo desde el cubo `first`
+
+    Como los cubos no dependen de la longitud de la serie, al añadir puntos
+    solo cambian el último cubo y el anterior (cuyo vecino derecho cambió);
+    los demás se pueden conservar. Los vértices de cada cubo son la media del
+    cubo anterior y la del siguiente (el primer y el último punto en los
+    bordes); los NaN no se eligen salvo que el cubo no tenga otra cosa.
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    # Se calculan las medias desde el cubo anterior al primero pedido
+    offset = 2 * max(first - 1, 0)
+    sx, sy = x[offset:], y[offset:]
+    m = len(sx)
+    starts = np.arange(0, m, 2)
+    counts = np.diff(np.append(starts, m))
+    valid = ~np.isnan(sy)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.add.reduceat(sx, starts) / counts
+        mean_y = np.add.reduceat(np.where(valid, sy, 0.0), starts) / np.add.reduceat(valid.astype(np.float64), starts)
+    left_x = np.concatenate(([x[0]] if offset == 0 else [], mean_x[:-1]))
+    left_y = np.concatenate(([y[0]] if offset == 0 else [], mean_y[:-1]))
+    right_x = np.append(mean_x[1:], x[-1])
+    right_y = np.append(mean_y[1:], y[-1])
+    skip = first - offset // 2
+    left_x, left_y = left_x[skip - (offset > 0):], left_y[skip - (offset > 0):]
+    right_x, right_y = right_x[skip:], right_y[skip:]
+    candidates = np.stack((starts[skip:], np.minimum(starts[skip:] + 1, m - 1)))
+    with np.errstate(invalid='ignore'):
+        area = np.abs((left_x - right_x) * (sy[candidates] - left_y) - (left_x - sx[candidates]) * (right_y - left_y))
+    area = np.where(np.isnan(area), -1.0, area)
+    return offset + candidates[(area[1] > area[0]).astype(np.intp), np.arange(candidates.shape[1])]
+
+
+class LttbPyramid:
+    """Pirámide de resoluciones de una serie para servir vistas con un presupuesto de puntos
+
+    El nivel 0 es la serie completa y cada nivel siguiente toma un punto de
+    cada pareja del anterior (pair_lttb) más su último punto, hasta
+    PYRAMID_BASE_POINTS. Una vista (tramo de x y presupuesto) se resuelve desde
+    el nivel más grueso que aún tiene suficientes puntos en el tramo, así solo
+    se reduce un tramo de como mucho el doble del presupuesto. Los cruces de
+    `thresholds` se conservan siempre. Todos los índices son de la serie
+    original, así se pueden tomar los mismos puntos de otras series alineadas.
+
+    extend() añade puntos al final rehaciendo solo los cubos de la cola de
+    cada nivel, así una tendencia que crece no reconstruye la pirámide.
+    """
+
+    __slots__ = ('x', 'y', 'levels', 'keep', 'thresholds', 'base_points', '_bodies')
+
+    def __init__(self, x, y, thresholds=None, base_points=PYRAMID_BASE_POINTS):
+        self.thresholds = thresholds
+        self.base_points = base_points
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+        self.keep = np.empty(0, dtype=np.intp)
+        self.levels = [np.empty(0, dtype=np.intp)]
+        # Punto elegido de cada cubo, por nivel (sin el último punto que se añade al nivel)
+        self._bodies = []
+        self.extend(x, y)
+
+    def __len__(self):
+        return len(self.x)
+
+    def extend(self, x, y):
+        """Sustituye la serie por `x`/`y`, que deben empezar por los puntos ya indexados"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        changed = len(self.x)
+        if len(x) < changed:
+            raise ValueError("La serie extendida no puede ser más corta que la anterior")
+        self.x, self.y = x, y
+        if len(x) == changed:
+            return self
+        # Cruces de umbral del tramo nuevo (incluida la transición desde el último punto anterior)
+        if self.thresholds:
+            tail = max(changed - 1, 0)
+            self.keep = np.concatenate((self.keep, crossing_indices(y[tail:], self.thresholds) + tail))
+        self.levels[0] = np.arange(len(x))
+        depth = 0
+        while len(self.levels[depth]) > 2 * self.base_points:
+            level = self.levels[depth]
+            if depth == len(self._bodies):
+                # Nivel nuevo: se construye entero
+                self._bodies.append(np.empty(0, dtype=np.intp))
+                self.levels.append(None)
+                changed = 0
+            first = max(changed // 2 - 1, 0)
+            body = np.concatenate((self._bodies[depth][:first],
+                                   level[pair_lttb(self.x[level], self.y[level], first)]))
+            self._bodies[depth] = body
+            self.levels[depth + 1] = body if body[-1] == level[-1] else np.append(body, level[-1])
+            changed = first
+            depth += 1
+        return self
+
+    def view(self, x_min=None, x_max=None, budget=PYRAMID_BASE_POINTS):
+        """Índices (ordenados) de los puntos a dibujar en [x_min, x_max], como mucho `budget`
+
+        El primer y el último punto del tramo se incluyen siempre; los cruces
+        de umbral ocupan como mucho una cuarta parte del presupuesto y la
+        reducción se queda con el resto.
+        """
+        lo = 0 if x_min is None else np.searchsorted(self.x, x_min, side='left')
+        hi = len(self.x) if x_max is None else np.searchsorted(self.x, x_max, side='right')
+        if hi <= lo or budget <= 0:
+            return np.empty(0, dtype=np.intp)
+        ends = np.array([lo, hi - 1], dtype=np.intp)[:budget]
+        keep = self.keep
+        if len(keep):
+            keep = keep[(keep >= lo) & (keep < hi)]
+            if len(keep) > budget // 4:
+                keep = keep[np.linspace(0, len(keep) - 1, budget // 4).astype(np.intp)]
+        # Los extremos y los cruces se reservan dentro del presupuesto
+        base_budget = budget - len(ends) - len(keep)
+        selected = ends
+        if base_budget >= 3:
+            for level in reversed(self.levels):
+                level = level[np.searchsorted(level, lo):np.searchsorted(level, hi)]
+                if len(level) >= base_budget:
+                    break
+            if len(level) > base_budget:
+                level = level[lttb_indices(self.x[level], self.y[level], base_budget)]
+            selected = np.union1d(selected, level)
+        return np.union1d(selected, keep)
+
+
+class PyramidCache:
+    """Pirámides de las series de la tendencia de una sesión
+
+    Una serie que solo crece (misma `series_key`) extiende su pirámide; se
+    reconstruye cuando cambia la clave o los puntos ya indexados.
+    """
+
+    __slots__ = ('builds', '_pyramids')
+
+    def __init__(self):
+        self.builds = 0
+        self._pyramids = {}
+
+    def get(self, name, series_key, x, y, thresholds=None):
+        """Pirámide de la serie `name`; `series_key` cambia cuando la serie deja de ser la anterior más puntos nuevos
+
+        Los cruces de `thresholds` se conservan siempre en las vistas.
+        """
+        cached = self._pyramids.get(name)
+        if cached is not None and cached[0] == series_key:
+            pyramid = cached[1]
+            n = len(pyramid)
+            # Comprobación barata de que los puntos ya indexados no cambiaron
+            if n <= len(x) and (n == 0 or (pyramid.x[n - 1] == x[n - 1] and
+                                           np.array_equal(pyramid.y[n - 1], y[n - 1], equal_nan=True))):
+                return pyramid.extend(x, y)
+        pyramid = LttbPyramid(x, y, thresholds)
+        self._pyramids[name] = (series_key, pyramid)
+        self.builds += 1
+        return pyramid
+
+    def clear(self):
+        self._pyramids.clear()
@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+
+class FigureRegistry:
+    """Figuras persistentes de una sesión, por fuente (paciente o cama) y nombre
+
+    Cada figura se construye una sola vez con su esqueleto (layout, bandas de
+    color, plantillas de hover) y en cada frame solo se actualizan sus datos
+    en el sitio. Se guardan las figuras de las últimas `max_sources` fuentes,
+    así volver a una cama no reconstruye nada.
+    """
+
+    __slots__ = ('max_sources', 'builds', 'hits', '_figures')
+
+    def __init__(self, max_sources=4):
+        self.max_sources = max_sources
+        self.builds = 0
+        self.hits = 0
+        self._figures = OrderedDict()
+
+    def get(self, source, name, build):
+        """Figura `name` de la fuente; `build()` la crea solo la primera vez"""
+        figures = self._figures.get(source)
+        if figures is None:
+            figures = self._figures[source] = {}
+            while len(self._figures) > self.max_sources:
+                self._figures.popitem(last=False)
+        else:
+            self._figures.move_to_end(source)
+        fig = figures.get(name)
+        if fig is None:
+            fig = figures[name] = build()
+            self.builds += 1
+        else:
+            self.hits += 1
+        return fig
+
+    def clear(self, source=None):
+        """Descarta las figuras de una fuente (o todas); se reconstruyen al pedirlas"""
+        if source is None:
+            self._figures.clear()
+        else:
+            self._figures.pop(source, None)
+
+    def __len__(self):
+        return sum(len(figures) for figures in self._figures.values())
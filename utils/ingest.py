@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.schema import normalize_frame
+from utils.cache import numeric_frame, store_frame
+
+# Filas por bloque en la ingesta en streaming
+CHUNK_ROWS = 500
+
+
+def count_csv_rows(file_path):
+    """Cuenta las filas de datos de un CSV sin parsearlo (para estimar el progreso)"""
+    lines = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(0, lines - 1)
+
+
+def iter_xlsx_chunks(file_path, chunk_rows=CHUNK_ROWS, skip_rows=0):
+    """Itera un libro xlsx por bloques de filas con openpyxl en modo read_only
+
+    Devuelve primero el número estimado de filas (según la dimensión de la
+    hoja, 0 si no se conoce) y después un DataFrame por bloque. Con
+    `skip_rows` se empieza tras esa cantidad de filas de datos, sin
+    convertirlas (para seguir un archivo que crece).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if header is None:
+            yield 0
+            return
+        rows = sheet.iter_rows(min_row=2 + skip_rows, values_only=True)
+        yield max(0, (sheet.max_row or 1) - 1)
+        columns = [str(c) if c is not None else f"col_{i}" for i, c in enumerate(header)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Itera un CSV por bloques; devuelve primero el número de filas y luego un DataFrame por bloque"""
+    yield count_csv_rows(file_path)
+    for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+        yield chunk
+
+
+def iter_file_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Elige el lector por extensión; los .xls antiguos se leen de una vez"""
+    if file_path.endswith('.csv'):
+        return iter_csv_chunks(file_path, chunk_rows)
+    if file_path.endswith('.xlsx'):
+        return iter_xlsx_chunks(file_path, chunk_rows)
+    df = pd.read_excel(file_path)
+    return iter([len(df), df])
+
+
+def ingest_file(record, file_path, chunk_rows=CHUNK_ROWS, cache=True):
+    """Llena un PatientRecord bloque a bloque; pensado para correr en un hilo de fondo
+
+    Al terminar, el archivo completo se guarda en la caché columnar (si
+    `cache`), así la siguiente carga del mismo contenido no lo vuelve a parsear.
+    """
+    try:
+        chunks = iter_file_chunks(file_path, chunk_rows)
+        record.expected_rows = next(chunks)
+        source = os.path.basename(file_path)
+        frames = []
+        for i, chunk in enumerate(chunks):
+            # Solo el primer bloque avisa de canales ausentes (la cabecera es la misma)
+            record.append(normalize_frame(chunk, source, warn=(i == 0), row_offset=record.n_rows))
+            if cache:
+                frames.append(chunk)
+        record.finish()
+    except Exception as e:
+        print(f"Error al cargar {file_path}: {e}")
+        record.finish(error=str(e))
+        return
+    if cache and frames:
+        store_frame(file_path, numeric_frame(pd.concat(frames, ignore_index=True), source))
@@ -0,0 +1,407 @@
+import json
+import time
+import asyncio
+import argparse
+import threading
+import numpy as np
+from utils.schema import (CHANNELS, CHANNEL_INDEX, REQUIRED_CHANNELS, TIME, NOMINAL_INTERVAL_SECONDS,
+                          NormalizedFrame, resolve_columns, normalize_frame)
+from utils.patient_store import PatientRecord
+from utils.risk_index import score_rows
+from utils.cache import read_cached_excel
+
+DEFAULT_FEED_HOST = '127.0.0.1'
+DEFAULT_FEED_PORT = 7400
+
+# Cama a la que se asignan los registros que no indican una
+DEFAULT_BED = 'bed-1'
+
+# Latencias recientes guardadas para los percentiles
+LATENCY_WINDOW = 2048
+
+# Tamaño máximo de un datagrama UDP enviado por el simulador (bytes)
+MAX_DATAGRAM_BYTES = 8192
+
+# Una cama que no envía datos durante este tiempo se da por cerrada y se libera del almacén (s)
+BED_IDLE_SECONDS = 15 * 60
+
+# Intervalo entre barridos de camas inactivas (s)
+BED_SWEEP_SECONDS = 60
+
+
+def bed_key(bed):
+    """Clave en el almacén de pacientes de una cama en vivo"""
+    return f"bed:{bed}"
+
+
+class FeedMetrics:
+    """Contadores del feed: registros, bytes, errores, caudal y latencia socket -> riesgo"""
+
+    __slots__ = ('records', 'bytes', 'errors', 'first_at', 'last_at', '_latency', '_latency_n')
+
+    def __init__(self):
+        self.records = 0
+        self.bytes = 0
+        self.errors = 0
+        self.first_at = None
+        self.last_at = None
+        self._latency = np.zeros(LATENCY_WINDOW, dtype=np.float64)
+        self._latency_n = 0
+
+    def observe(self, count, nbytes, latencies=None):
+        now = time.time()
+        if self.first_at is None:
+            self.first_at = now
+        self.last_at = now
+        self.records += count
+        self.bytes += nbytes
+        if latencies is not None and len(latencies):
+            latencies = latencies[-LATENCY_WINDOW:]
+            pos = (self._latency_n + np.arange(len(latencies))) % LATENCY_WINDOW
+            self._latency[pos] = latencies
+            self._latency_n += len(latencies)
+
+    def snapshot(self):
+        """Resumen: registros/s sostenidos y latencia (ms) de las últimas muestras"""
+        elapsed = (self.last_at - self.first_at) if self.first_at is not None else 0.0
+        summary = {
+            'records': self.records,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'records_per_s': self.records / elapsed if elapsed > 0 else 0.0,
+        }
+        latency = self._latency[:min(self._latency_n, LATENCY_WINDOW)] * 1000
+        if len(latency):
+            summary['latency_p50_ms'] = float(np.percentile(latency, 50))
+            summary['latency_p95_ms'] = float(np.percentile(latency, 95))
+            summary['latency_max_ms'] = float(latency.max())
+        return summary
+
+
+def parse_lines(lines):
+    """Convierte líneas JSON en bloques por cama: {cama: (filas canal x n, instantes de envío)}
+
+    Cada línea es un objeto con los canales de las exportaciones (Time, MAP,
+    CO, SVV, PPV, HPI...; se aceptan los mismos alias que al cargar archivos),
+    y opcionalmente `bed` y `sent_at` (epoch en s, para medir la latencia).
+    Devuelve también el número de líneas inválidas.
+    """
+    beds = {}
+    errors = 0
+    resolved_cache = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            errors += 1
+            continue
+        if not isinstance(record, dict):
+            errors += 1
+            continue
+        fields = tuple(record)
+        resolved = resolved_cache.get(fields)
+        if resolved is None:
+            resolved = resolved_cache[fields] = [(CHANNEL_INDEX[channel], column)
+                                                 for channel, column in resolve_columns(fields).items()]
+        row = np.full(len(CHANNELS), np.nan, dtype=np.float32)
+        for idx, column in resolved:
+            try:
+                row[idx] = record[column]
+            except (TypeError, ValueError):
+                pass
+        rows, sent = beds.setdefault(str(record.get('bed', DEFAULT_BED)), ([], []))
+        rows.append(row)
+        sent.append(record.get('sent_at', np.nan))
+    blocks = {bed: (np.stack(rows, axis=1), np.asarray(sent, dtype=np.float64))
+              for bed, (rows, sent) in beds.items()}
+    return blocks, errors
+
+
+class _UdpFeedProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.feed(data.split(b'\n'), len(data))
+
+
+class FeedServer:
+    """Recibe registros de monitores en vivo por TCP o UDP y los añade a la cama correspondiente
+
+    Corre en su propio bucle asyncio en un hilo de fondo. Cada cama es un
+    PatientRecord `live` registrado en el almacén de pacientes, así que la
+    reproducción la lee igual que un archivo en carga. El riesgo de cada
+    bloque se calcula al llegar para medir la latencia de extremo a extremo.
+    Las camas sin datos durante `idle_seconds` se cierran y su registro se
+    libera del almacén.
+    """
+
+    def __init__(self, store=None, host=DEFAULT_FEED_HOST, port=DEFAULT_FEED_PORT, protocol='tcp',
+                 idle_seconds=BED_IDLE_SECONDS):
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError("El protocolo del feed debe ser 'tcp' o 'udp'")
+        self.store = store
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.idle_seconds = idle_seconds
+        self.metrics = FeedMetrics()
+        self.beds = {}
+        self.last_risk = {}
+        self._last_seen = {}
+        self.error = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def bed(self, bed):
+        """Registro en vivo de una cama, creado la primera vez que envía datos"""
+        record = self.beds.get(bed)
+        if record is None:
+            record = PatientRecord(bed_key(bed), live=True)
+            if self.store is not None:
+                record = self.store.register(bed_key(bed), record)
+            self.beds[bed] = record
+        return record
+
+    def bed_names(self):
+        """Nombres de las camas abiertas, ordenados (copia tomada con el candado: el feed los cambia en su hilo)"""
+        with self._lock:
+            return sorted(self.beds)
+
+    def close_bed(self, bed):
+        """Cierra una cama: deja de listarse y su registro se libera del almacén"""
+        with self._lock:
+            record = self.beds.pop(bed, None)
+            self.last_risk.pop(bed, None)
+            self._last_seen.pop(bed, None)
+        if record is not None and self.store is not None:
+            self.store.release(bed_key(bed))
+        return record
+
+    def close_idle_beds(self, now=None):
+        """Cierra las camas que no envían datos desde hace más de `idle_seconds`; devuelve sus nombres"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [bed for bed, seen in self._last_seen.items() if now - seen > self.idle_seconds]
+        for bed in idle:
+            self.close_bed(bed)
+        return idle
+
+    def _sweep(self):
+        self.close_idle_beds()
+        self._loop.call_later(BED_SWEEP_SECONDS, self._sweep)
+
+    def _arrival_times(self, record, n):
+        """Tiempos de un lote sin columna Time: segundos desde la llegada del primer dato
+
+        Los registros del lote se reparten entre el último tiempo de la cama y
+        la llegada del lote; el primer lote, o uno que llega antes de ese
+        último tiempo, usa el intervalo nominal de las exportaciones.
+        """
+        now = time.time()
+        arrival = now - (self.metrics.first_at or now)
+        steps = np.arange(1, n + 1, dtype=np.float32)
+        if not record.n_rows:
+            return (steps - 1) * NOMINAL_INTERVAL_SECONDS
+        previous = float(record.channel(TIME)[-1])
+        step = (arrival - previous) / n
+        if step <= 0:
+            step = NOMINAL_INTERVAL_SECONDS
+        return previous + steps * step
+
+    def feed(self, lines, nbytes=0):
+        """Procesa un lote de líneas recibidas"""
+        blocks, errors = parse_lines(lines)
+        with self._lock:
+            self.metrics.errors += errors
+            count = 0
+            latencies = []
+            for bed, (data, sent_at) in blocks.items():
+                record = self.bed(bed)
+                self._last_seen[bed] = time.monotonic()
+                start = record.n_rows
+                if np.isnan(data[TIME]).all():
+                    data[TIME] = self._arrival_times(record, data.shape[1])
+                present = ~np.isnan(data).all(axis=1)
+                missing = [name for name in REQUIRED_CHANNELS if not present[CHANNEL_INDEX[name]]]
+                record.append(NormalizedFrame(data, present, missing))
+                risk = score_rows(record, start, record.n_rows)
+                self.last_risk[bed] = float(risk[-1])
+                count += data.shape[1]
+                latencies.append(time.time() - sent_at[~np.isnan(sent_at)])
+            if count or nbytes:
+                self.metrics.observe(count, nbytes, np.concatenate(latencies) if latencies else None)
+
+    async def _handle_tcp(self, reader, writer):
+        pending = b''
+        try:
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    break
+                lines, _, pending = (pending + chunk).rpartition(b'\n')
+                if lines:
+                    self.feed(lines.split(b'\n'), len(lines) + 1)
+            if pending:
+                self.feed([pending], len(pending))
+        finally:
+            writer.close()
+
+    async def _serve(self):
+        if self.protocol == 'tcp':
+            server = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+        else:
+            transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _UdpFeedProtocol(self), local_addr=(self.host, self.port))
+            self.port = transport.get_extra_info('sockname')[1]
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except OSError as e:
+            self.error = OSError(f"No se pudo abrir el feed en {self.host}:{self.port}: {e}")
+            self._loop.close()
+            self._ready.set()
+            return
+        self._ready.set()
+        self._loop.call_later(BED_SWEEP_SECONDS, self._sweep)
+        self._loop.run_forever()
+
+    def start(self):
+        """Abre el socket en un hilo de fondo; devuelve el servidor cuando ya escucha
+
+        Lanza OSError si no se puede abrir el socket (puerto ocupado, dirección inválida...).
+        """
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def workbook_lines(file_path, bed=DEFAULT_BED):
+    """Filas de un libro como objetos listos para el feed (solo canales presentes, sin NaN)"""
+    frame = normalize_frame(read_cached_excel(file_path), file_path, warn=False)
+    names = [name for name, ok in zip(CHANNELS, frame.present) if ok]
+    rows = frame.data[[CHANNEL_INDEX[name] for name in names]].T.tolist()
+    for values in rows:
+        record = {name: value for name, value in zip(names, values) if value == value}
+        record['bed'] = bed
+        yield record
+
+
+async def simulate_workbook(file_path, host=DEFAULT_FEED_HOST, port=DEFAULT_FEED_PORT, rate=10.0,
+                            protocol='tcp', bed=DEFAULT_BED, duration=None, loop=False):
+    """Monitor simulado: reproduce un libro por un socket local a `rate` registros por segundo
+
+    Envía en ráfagas cada 20 ms para sostener caudales altos; cada registro
+    lleva `sent_at` para medir la latencia. Devuelve el número de registros.
+    """
+    records = list(workbook_lines(file_path, bed))
+    if not records:
+        return 0
+    # Al repetir el libro el tiempo sigue avanzando: cada vuelta se desplaza una duración completa
+    times = [record['Time'] for record in records]
+    span = times[-1] - times[0] + (times[1] - times[0] if len(times) > 1 else 1)
+    if protocol == 'tcp':
+        _, writer = await asyncio.open_connection(host, port)
+        send = writer.write
+    else:
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(host, port))
+        send = transport.sendto
+
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        elapsed = time.perf_counter() - started
+        if duration is not None and elapsed >= duration:
+            break
+        due = int(elapsed * rate) + 1
+        if not loop:
+            due = min(due, len(records))
+        batch = []
+        now = time.time()
+        for i in range(sent, due):
+            cycle, row = divmod(i, len(records))
+            record = dict(records[row], sent_at=now)
+            if cycle:
+                record['Time'] += cycle * span
+            batch.append(json.dumps(record).encode('utf-8') + b'\n')
+        sent = due
+        if protocol == 'tcp':
+            send(b''.join(batch))
+            await writer.drain()
+        else:
+            datagram = b''
+            for line in batch:
+                if len(datagram) + len(line) > MAX_DATAGRAM_BYTES:
+                    send(datagram)
+                    datagram = b''
+                datagram += line
+            if datagram:
+                send(datagram)
+        if not loop and sent >= len(records):
+            break
+        await asyncio.sleep(0.02)
+
+    if protocol == 'tcp':
+        writer.close()
+        await writer.wait_closed()
+    else:
+        transport.close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rosphere feed',
+                                     description='Live monitor feed: simulator and throughput/latency bench')
+    parser.add_argument('mode', choices=('simulate', 'bench'),
+                        help='simulate: send a workbook to a running feed; bench: local server + simulator')
+    parser.add_argument('patient', help='patient id or path of the workbook to replay')
+    parser.add_argument('--data-dir', default='data/HEMODINAMICA', help='folder with the patient workbooks')
+    parser.add_argument('--host', default=DEFAULT_FEED_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_FEED_PORT)
+    parser.add_argument('--udp', action='store_true', help='send datagrams instead of a TCP stream')
+    parser.add_argument('--rate', type=float, default=10.0, help='records per second')
+    parser.add_argument('--bed', default=DEFAULT_BED)
+    parser.add_argument('--duration', type=float, default=None, help='seconds to run (default: whole workbook)')
+    parser.add_argument('--loop', action='store_true', help='restart the workbook when it ends')
+    args = parser.parse_args(argv)
+
+    file_path = args.patient if args.patient.endswith(('.xlsx', '.xls')) else f"{args.data_dir}/{args.patient}.xlsx"
+    protocol = 'udp' if args.udp else 'tcp'
+    server = None
+    port = args.port
+    if args.mode == 'bench':
+        server = FeedServer(host=args.host, port=0, protocol=protocol).start()
+        port = server.port
+
+    sent = asyncio.run(simulate_workbook(file_path, args.host, port, args.rate, protocol,
+                                         args.bed, args.duration, args.loop))
+    print(f"Sent {sent} records from {file_path} over {protocol.upper()} {args.host}:{port}")
+    if server is not None:
+        # Dar tiempo a que lleguen los últimos datagramas
+        time.sleep(0.2)
+        summary = server.metrics.snapshot()
+        print(f"Received {summary['records']} records ({summary['errors']} invalid) "
+              f"at {summary['records_per_s']:,.0f} records/s")
+        if 'latency_p50_ms' in summary:
+            print(f"Latency socket -> risk: p50 {summary['latency_p50_ms']:.2f} ms, "
+                  f"p95 {summary['latency_p95_ms']:.2f} ms, max {summary['latency_max_ms']:.2f} ms")
+        server.stop()
+    return 0
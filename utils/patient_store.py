@@ -0,0 +1,348 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+from utils.data_processor import load_patient_data
+from utils.cache import file_digest
+from utils.schema import normalize_frame, CHANNELS, CHANNEL_INDEX, REQUIRED_CHANNELS
+from utils.ingest import ingest_file
+from utils.cleaning import SignalCleaner
+
+# Memoria máxima de los registros del almacén antes de expulsar los menos usados (bytes)
+DEFAULT_STORE_BYTES = 1024 * 1024 * 1024
+
+
+class PatientRecord:
+    """Datos normalizados de un paciente, de solo lectura y compartidos entre sesiones
+
+    Las columnas viven en un bloque float32 (canal x fila) en el orden de
+    schema.CHANNELS, así que se pueden pedir por nombre o por posición.
+    Un registro creado sin DataFrame se va llenando por bloques (ingesta en
+    streaming) hasta que se llama a finish(); los lectores siempre ven un
+    prefijo consistente de filas. Cada bloque pasa por la limpieza de
+    artefactos (utils.cleaning) al añadirse: `data` tiene los valores limpios,
+    `mask` los huecos de la fuente y `flags` las banderas de calidad por
+    muestra. Los registros `live` (camas con monitor
+    conectado) no terminan nunca: siguen creciendo mientras llegan datos, y
+    los canales presentes son la unión de los de todos los bloques.
+    """
+
+    __slots__ = ('key', 'present', 'missing', 'expected_rows', 'complete', 'error', 'live',
+                 'source_digest', '_block', '_mask', '_flags', '_cleaner', '_n', '_lock')
+
+    def __init__(self, key, df=None, source_digest=None, expected_rows=0, live=False):
+        self.key = key
+        self.live = live
+        # Hash del archivo de origen (None para datos simulados): invalida los derivados en caché
+        self.source_digest = source_digest
+        self.expected_rows = expected_rows
+        self.complete = False
+        self.error = None
+        self.present = None
+        self.missing = []
+        self._block = None
+        self._mask = None
+        self._flags = None
+        self._cleaner = SignalCleaner()
+        self._n = 0
+        self._lock = threading.Lock()
+        if df is not None:
+            self.append(normalize_frame(df, str(key)))
+            self.finish()
+
+    def _rows(self, attr, dtype):
+        # El bloque y el número de filas se leen juntos bajo el candado: append() puede estar cambiando ambos
+        with self._lock:
+            block, n_rows = getattr(self, attr), self._n
+        if block is None:
+            return np.empty((len(CHANNELS), 0), dtype=dtype)
+        view = block[:, :n_rows]
+        # Inmutable: cualquier sesión puede tomar vistas sin copiar
+        view.flags.writeable = False
+        return view
+
+    @property
+    def data(self):
+        """Bloque canal x fila con las filas disponibles (vista de solo lectura)"""
+        return self._rows('_block', np.float32)
+
+    @property
+    def mask(self):
+        return self._rows('_mask', bool)
+
+    @property
+    def flags(self):
+        """Banderas de calidad (utils.cleaning.FLAG_*) por canal y fila; 0 = muestra original válida"""
+        return self._rows('_flags', np.uint8)
+
+    @property
+    def n_rows(self):
+        return self._n
+
+    @property
+    def progress(self):
+        """Fracción cargada (1.0 cuando la ingesta terminó)"""
+        if self.complete:
+            return 1.0
+        if self.expected_rows:
+            return min(0.99, self._n / self.expected_rows)
+        return 0.0
+
+    def append(self, frame):
+        """Añade un bloque normalizado (NormalizedFrame) al final del registro, ya limpio"""
+        with self._lock:
+            # Un canal puede aparecer en un bloque posterior (p. ej. una cama cuyo primer registro no lo trae)
+            if self.present is None or not self.present[frame.present].all():
+                present = frame.present.copy() if self.present is None else self.present | frame.present
+                present.flags.writeable = False
+                self.present = present
+                self.missing = [name for name in REQUIRED_CHANNELS if not present[CHANNEL_INDEX[name]]]
+            values, flags = self._cleaner.clean(frame.data)
+            # Un canal que la fuente no trae no es un artefacto
+            flags[~self.present] = 0
+            count = frame.n_rows
+            needed = self._n + count
+            if self._block is None or needed > self._block.shape[1]:
+                # Crecer por duplicación; las vistas ya entregadas siguen siendo válidas
+                capacity = max(needed, self.expected_rows, 2 * (0 if self._block is None else self._block.shape[1]))
+                block = np.full((len(CHANNELS), capacity), np.nan, dtype=np.float32)
+                mask = np.ones((len(CHANNELS), capacity), dtype=bool)
+                flag_block = np.zeros((len(CHANNELS), capacity), dtype=np.uint8)
+                if self._block is not None:
+                    block[:, :self._n] = self._block[:, :self._n]
+                    mask[:, :self._n] = self._mask[:, :self._n]
+                    flag_block[:, :self._n] = self._flags[:, :self._n]
+                self._block, self._mask, self._flags = block, mask, flag_block
+            self._block[:, self._n:needed] = values
+            self._mask[:, self._n:needed] = frame.mask
+            self._flags[:, self._n:needed] = flags
+            # Publicar las filas nuevas solo cuando ya están escritas
+            self._n = needed
+
+    def finish(self, error=None):
+        """Marca el final de la ingesta"""
+        self.error = error
+        if self.present is None:
+            self.present = np.zeros(len(CHANNELS), dtype=bool)
+        self.complete = True
+
+    def channel(self, idx):
+        """Devuelve el canal en la posición idx como vista de solo lectura, o None si no existe"""
+        return self.data[idx] if self.present is not None and self.present[idx] else None
+
+    def column(self, name):
+        """Devuelve la columna de un canal canónico, o None si no existe"""
+        idx = CHANNEL_INDEX.get(name)
+        return None if idx is None else self.channel(idx)
+
+    def has(self, name):
+        idx = CHANNEL_INDEX.get(name)
+        return idx is not None and self.present is not None and bool(self.present[idx])
+
+    def head(self, rows=5):
+        """Primeras filas de los canales presentes, para vistas previas"""
+        if self.present is None:
+            return pd.DataFrame()
+        data = self.data[:, :rows]
+        return pd.DataFrame({name: data[i] for i, name in enumerate(CHANNELS) if self.present[i]})
+
+    def nbytes(self):
+        if self._block is None:
+            return 0
+        return self._block.nbytes + self._mask.nbytes + self._flags.nbytes
+
+
+class PatientStore:
+    """Almacén de pacientes por proceso: cada paciente se carga una sola vez
+
+    Los registros también se indexan por hash del archivo de origen: claves
+    distintas con el mismo contenido comparten un único registro. Si la
+    memoria de los registros supera `max_bytes` se expulsan los menos usados
+    que se pueden volver a cargar (completos y no en vivo): un libro de la
+    carpeta se relee y una subida se vuelve a ingerir desde su archivo.
+    Las claves con ':' (subidas, camas, archivos seguidos) nunca se buscan en
+    la carpeta; se liberan con release() cuando su fuente se cierra. Los
+    derivados de un registro (p. ej. su línea de riesgo) se registran con
+    add_forget_hook() para liberarse junto con él.
+    """
+
+    def __init__(self, folder_path='data/HEMODINAMICA', max_bytes=DEFAULT_STORE_BYTES):
+        self.folder_path = folder_path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        # Orden de uso: el menos usado primero
+        self._records = OrderedDict()
+        self._by_digest = {}
+        # clave -> (archivo, hash) de las subidas, para volver a ingerirlas tras expulsarlas
+        self._sources = {}
+        # clave -> Future de las cargas en frío en curso: la lectura se hace fuera del candado
+        self._loading = {}
+        # Funciones llamadas con cada registro que sale del almacén (expulsado o liberado)
+        self._forget_hooks = []
+        self._lock = threading.Lock()
+
+    def _register(self, key, record):
+        # Llamar con el candado tomado
+        self._records[key] = record
+        self._records.move_to_end(key)
+        if record.source_digest is not None:
+            self._by_digest.setdefault(record.source_digest, record)
+
+    def _forget(self, record):
+        # Llamar con el candado tomado: quita el registro de todas sus claves y del índice por hash
+        for key in [key for key, other in self._records.items() if other is record]:
+            del self._records[key]
+        if record.source_digest is not None and self._by_digest.get(record.source_digest) is record:
+            del self._by_digest[record.source_digest]
+        for hook in self._forget_hooks:
+            hook(record)
+
+    def add_forget_hook(self, hook):
+        """Llama a `hook(registro)` cuando un registro sale del almacén; debe ser rápida (corre con el candado)"""
+        with self._lock:
+            self._forget_hooks.append(hook)
+
+    def _evict(self, keep=None):
+        # Llamar con el candado tomado: expulsa los registros menos usados hasta caber en max_bytes
+        last_use = {}
+        for position, record in enumerate(self._records.values()):
+            last_use[id(record)] = (position, record)
+        total = sum(record.nbytes() for _, record in last_use.values())
+        for _, record in sorted(last_use.values(), key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if record is keep or record.live or not record.complete:
+                continue
+            self._forget(record)
+            total -= record.nbytes()
+            self.evictions += 1
+        # Las subidas cuyo archivo ya caducó no se pueden volver a ingerir
+        for key, (file_path, _) in list(self._sources.items()):
+            if key not in self._records and not os.path.exists(file_path):
+                del self._sources[key]
+
+    def get(self, key):
+        """Devuelve el registro de un paciente, cargándolo si todavía no está en memoria
+
+        El libro se lee fuera del candado del almacén: una carga en frío no
+        frena a las demás sesiones, y las que piden el mismo paciente esperan
+        a esa misma carga. Lanza KeyError para una clave de fuente (con ':')
+        que ya no está en el almacén.
+        """
+        record = self._records.get(key)
+        if record is not None:
+            with self._lock:
+                if key in self._records:
+                    self._records.move_to_end(key)
+            return record
+        with self._lock:
+            # Otra sesión pudo cargarlo mientras esperábamos el candado
+            record = self._records.get(key)
+            if record is not None:
+                return record
+            if key in self._sources:
+                # Subida expulsada: se vuelve a ingerir desde su archivo
+                record = self._start_ingest(key, *self._sources[key])
+                self._evict(keep=record)
+                return record
+            if isinstance(key, str) and ':' in key:
+                raise KeyError(key)
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return loading.result()
+        try:
+            record = self._load(key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            # Publicar el registro y actualizar el LRU; conserva el de otra clave con el mismo contenido
+            record = self._by_digest.get(record.source_digest, record) if record.source_digest else record
+            self._register(key, record)
+            self._evict(keep=record)
+            del self._loading[key]
+        loading.set_result(record)
+        return record
+
+    def _load(self, key):
+        # Sin el candado: lectura y limpieza de un libro de la carpeta
+        file_path = os.path.join(self.folder_path, f"{key}.xlsx")
+        digest = file_digest(file_path) if os.path.exists(file_path) else None
+        record = self._by_digest.get(digest) if digest else None
+        if record is None:
+            record = PatientRecord(key, load_patient_data(key, self.folder_path), digest)
+        return record
+
+    def put(self, key, df, source_digest=None, file_path=None):
+        """Registra un DataFrame ya cargado (p. ej. un archivo subido) bajo la clave dada
+
+        Con `file_path` el registro se puede volver a ingerir desde el archivo si se expulsa.
+        """
+        with self._lock:
+            if file_path is not None:
+                self._sources[key] = (file_path, source_digest)
+            record = self._records.get(key)
+            if record is None:
+                record = self._by_digest.get(source_digest) if source_digest else None
+                if record is None:
+                    record = PatientRecord(key, df, source_digest)
+                self._register(key, record)
+                self._evict(keep=record)
+        return record
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def register(self, key, record):
+        """Registra un registro creado fuera del almacén (p. ej. una cama en vivo); conserva el existente"""
+        with self._lock:
+            existing = self._records.get(key)
+            if existing is not None:
+                return existing
+            self._register(key, record)
+        return record
+
+    def release(self, key):
+        """Olvida una clave cuya fuente se cerró (una subida retirada, una cama sin datos)
+
+        El registro se libera cuando ninguna otra clave lo usa; devuelve el registro o None.
+        """
+        with self._lock:
+            record = self._records.pop(key, None)
+            if record is not None and not any(other is record for other in self._records.values()):
+                self._forget(record)
+            self._evict()
+        return record
+
+    def nbytes(self):
+        # Los registros compartidos entre claves se cuentan una vez
+        unique = {id(record): record for record in list(self._records.values())}
+        return sum(record.nbytes() for record in unique.values())
+
+    def _start_ingest(self, key, file_path, source_digest):
+        # Llamar con el candado tomado
+        record = PatientRecord(key, source_digest=source_digest)
+        self._register(key, record)
+        threading.Thread(target=ingest_file, args=(record, file_path), daemon=True).start()
+        return record
+
+    def ingest(self, key, file_path, source_digest=None):
+        """Registra un archivo que se carga por bloques en segundo plano; devuelve el registro al instante"""
+        with self._lock:
+            self._sources[key] = (file_path, source_digest)
+            record = self._records.get(key) or (self._by_digest.get(source_digest) if source_digest else None)
+            if record is not None:
+                self._register(key, record)
+                return record
+            record = self._start_ingest(key, file_path, source_digest)
+            self._evict(keep=record)
+        return record
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+import numpy as np
+import plotly.io as pio
+
+# Tipos de los datos que viajan al navegador: plotly.py los serializa como arrays tipados
+# base64 ({dtype, bdata}), así que el tipo decide directamente el tamaño del mensaje
+VALUE_DTYPE = np.float32
+TIME_DTYPE = np.int32
+
+# Se mide uno de cada tantos frames: serializar otra vez cada figura solo para medirla cuesta tanto como enviarla
+PAYLOAD_SAMPLE_EVERY = 10
+
+
+def value_array(values):
+    """Valores de una traza como float32 (4 bytes por punto en lugar de 8)"""
+    return np.asarray(values, dtype=VALUE_DTYPE)
+
+
+def time_array(seconds):
+    """Eje de tiempo como segundos enteros int32; los tiempos sin valor quedan en 0"""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    return np.rint(np.nan_to_num(seconds, nan=0.0)).astype(TIME_DTYPE)
+
+
+def figure_bytes(fig):
+    """Tamaño (bytes) de la especificación JSON de la figura tal como se envía al navegador"""
+    return len(pio.to_json(fig, validate=False))
+
+
+class PayloadMetrics:
+    """Bytes de las figuras enviadas al navegador, por frame y por gráfica
+
+    Un frame es una ejecución de un fragmento de primer nivel (`with
+    frame():`); los fragmentos anidados que se ejecutan dentro suman al
+    mismo frame. Solo se mide uno de cada `sample_every` frames: en los
+    demás `add()` no serializa nada. Se guardan el total del último frame
+    medido y la media de los frames medidos.
+    """
+
+    __slots__ = ('sample_every', 'runs', 'frames', 'total_bytes', 'last_frame_bytes', 'charts', '_current',
+                 '_depth')
+
+    def __init__(self, sample_every=PAYLOAD_SAMPLE_EVERY):
+        self.sample_every = max(int(sample_every), 1)
+        self.runs = 0
+        self.frames = 0
+        self.total_bytes = 0
+        self.last_frame_bytes = 0
+        self.charts = {}
+        self._current = None
+        self._depth = 0
+
+    @contextmanager
+    def frame(self):
+        """Frame de una ejecución de fragmento; se cierra al salir del fragmento más externo"""
+        if self._depth == 0:
+            self._current = 0 if self.runs % self.sample_every == 0 else None
+            self.runs += 1
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._current is not None:
+                self.last_frame_bytes = self._current
+                self.total_bytes += self._current
+                self.frames += 1
+                self._current = None
+
+    def add(self, name, fig):
+        """Cuenta una figura enviada si el frame en curso se mide; devuelve su tamaño (None si no se mide)"""
+        if self._current is None:
+            return None
+        size = figure_bytes(fig)
+        self.charts[name] = size
+        self._current += size
+        return size
+
+    def snapshot(self):
+        return {
+            'frames': self.frames,
+            'sample_every': self.sample_every,
+            'last_frame_bytes': self.last_frame_bytes,
+            'average_frame_bytes': self.total_bytes / self.frames if self.frames else 0.0,
+            'charts': dict(self.charts),
+        }
@@ -0,0 +1,74 @@
+import time
+
+# Velocidades de reproducción disponibles (múltiplos del tiempo real)
+PLAYBACK_SPEEDS = (1, 10, 60, 600)
+
+
+class PlaybackClock:
+    """Reloj de reproducción anclado al reloj de pared
+
+    El tiempo simulado se calcula como ancla + (tiempo de pared transcurrido) x
+    velocidad, así que si el render se retrasa el siguiente fotograma salta
+    directamente al instante correcto en lugar de acumular retraso. Los
+    fotogramas que se saltan así quedan contados en `frames_skipped`.
+    """
+
+    __slots__ = ('speed', 'frame_interval', 'running', 'frames_skipped',
+                 '_anchor_wall', '_anchor_sim', '_last_tick')
+
+    def __init__(self, speed=1, frame_interval=0.5):
+        self.speed = speed
+        self.frame_interval = frame_interval
+        self.running = False
+        self.frames_skipped = 0
+        self._anchor_wall = time.monotonic()
+        self._anchor_sim = 0.0
+        self._last_tick = None
+
+    def now(self):
+        """Tiempo simulado actual en segundos"""
+        if not self.running:
+            return self._anchor_sim
+        return self._anchor_sim + (time.monotonic() - self._anchor_wall) * self.speed
+
+    def start(self, sim_time=None):
+        """Arranca (o reanuda) la reproducción desde sim_time o desde el instante actual"""
+        self._anchor_sim = self.now() if sim_time is None else float(sim_time)
+        self._anchor_wall = time.monotonic()
+        self._last_tick = None
+        self.running = True
+
+    def stop(self):
+        self._anchor_sim = self.now()
+        self.running = False
+
+    def seek(self, sim_time):
+        """Salta a un instante simulado sin cambiar el estado de reproducción"""
+        self._anchor_sim = float(sim_time)
+        self._anchor_wall = time.monotonic()
+        self._last_tick = None
+        self.frames_skipped = 0
+
+    def set_speed(self, speed):
+        # Re-anclar para que el cambio de velocidad no provoque un salto
+        self._anchor_sim = self.now()
+        self._anchor_wall = time.monotonic()
+        self.speed = speed
+
+    def tick(self, end=None):
+        """Avanza un fotograma: devuelve el tiempo simulado y contabiliza fotogramas saltados
+
+        Con `end` (último instante del registro) el reloj no lo sobrepasa: al
+        llegar se detiene en él.
+        """
+        wall = time.monotonic()
+        if self.running and self._last_tick is not None and self.frame_interval > 0:
+            frames = int((wall - self._last_tick) / self.frame_interval)
+            self.frames_skipped += max(0, frames - 1)
+        self._last_tick = wall
+        sim_time = self.now()
+        if end is not None and sim_time >= end:
+            self._anchor_sim = float(end)
+            self.running = False
+            return self._anchor_sim
+        return sim_time
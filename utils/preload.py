@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.cache import file_digest, load_cached_frame
+from utils.data_processor import read_patient_data
+from utils.patient_store import PatientRecord
+from utils.risk_index import RiskTimelineIndex
+from utils.catalog import PatientCatalog
+
+# Estados de precarga de cada paciente
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+# Raíz del proyecto: el proceso auxiliar de precarga se lanza desde aquí
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preload_patient(patient_id, data_dir):
+    """Trabajo de un proceso: carga y puntúa un paciente; devuelve el hash de su libro
+
+    Deja el libro y la línea de riesgo en la caché columnar de disco. Un
+    libro que falta o no se puede leer lanza una excepción: nunca se
+    precargan datos simulados.
+    """
+    df = read_patient_data(patient_id, data_dir)
+    digest = file_digest(os.path.join(data_dir, f"{patient_id}.xlsx"))
+    RiskTimelineIndex().get(PatientRecord(patient_id, df, digest))
+    return digest
+
+
+def preload_cohort(patients, data_dir, workers=None):
+    """Precarga los pacientes en un pool de procesos 'spawn'; escribe una línea JSON por paciente terminado"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(preload_patient, patient, data_dir): patient for patient in patients}
+        for future in as_completed(futures):
+            try:
+                result = {'patient': futures[future], 'digest': future.result()}
+            except Exception as e:
+                result = {'patient': futures[future], 'error': str(e)}
+            try:
+                print(json.dumps(result), flush=True)
+            except BrokenPipeError:
+                # El servidor que lanzó la precarga ya no escucha
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                pool.shutdown(cancel_futures=True)
+                return
+
+
+class CohortPreloader:
+    """Precarga en segundo plano todos los libros del catálogo
+
+    Cada contenido distinto se procesa una sola vez en un pool de procesos
+    (uno por núcleo) que deja el libro y su línea de riesgo en la caché de
+    disco; según termina cada uno se registra en el almacén compartido, así
+    el primer médico que abre una cama ya encuentra los datos y el riesgo
+    calculados. De paso completa las descripciones del manifiesto.
+
+    El pool corre en un proceso auxiliar (`python -m utils.preload`) y no
+    dentro del servidor: un fork de un servidor con hilos puede bloquearse, y
+    con 'spawn' cada proceso del pool volvería a importar __main__, que bajo
+    Streamlit es el propio script de la app.
+    """
+
+    def __init__(self, store, risk_index, catalog=None, workers=None):
+        self.store = store
+        self.risk_index = risk_index
+        self.catalog = catalog or PatientCatalog(store.folder_path).scan()
+        self.workers = workers
+        self.status = {}
+        self.errors = {}
+        self._thread = None
+
+    def start(self):
+        """Lanza la precarga en un hilo de fondo (una sola vez)"""
+        if self._thread is not None:
+            return self
+        groups = self.catalog.unique()
+        self.status = {key: PENDING for keys in groups.values() for key in keys}
+        self._thread = threading.Thread(target=self._run, args=(groups,), name='cohort-preload', daemon=True)
+        self._thread.start()
+        return self
+
+    def _fail(self, keys, error):
+        print(f"Error al precargar los pacientes {keys}: {error}")
+        for key in keys:
+            self.errors[key] = error
+            self.status[key] = FAILED
+
+    def _register(self, keys, digest):
+        # El libro ya está en la caché columnar: aquí solo se lee
+        data_dir = self.catalog.data_dir
+        df = load_cached_frame(self.catalog.path(keys[0]))
+        if df is None:
+            df = read_patient_data(keys[0], data_dir)
+        # Si una sesión ya lo cargó en frío, put() conserva ese registro;
+        # las demás claves con el mismo contenido comparten el registro
+        for key in keys:
+            record = self.store.put(key, df, digest)
+        # La línea de riesgo también está en disco
+        self.risk_index.get(record)
+        self.catalog.record(digest, record)
+        for key in keys:
+            self.status[key] = READY
+
+    def _run(self, groups):
+        if not groups:
+            return
+        pending = {str(keys[0]): keys for keys in groups.values()}
+        command = [sys.executable, '-m', 'utils.preload', '--data-dir', os.path.abspath(self.catalog.data_dir)]
+        if self.workers:
+            command += ['--workers', str(self.workers)]
+        try:
+            process = subprocess.Popen(command + list(pending), cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True)
+        except OSError as e:
+            for keys in pending.values():
+                self._fail(keys, str(e))
+            return
+        for line in process.stdout:
+            try:
+                result = json.loads(line)
+                keys = pending.pop(result['patient'])
+            except (ValueError, KeyError):
+                continue
+            try:
+                if 'error' in result:
+                    raise RuntimeError(result['error'])
+                self._register(keys, result['digest'])
+            except Exception as e:
+                self._fail(keys, str(e))
+        code = process.wait()
+        for keys in pending.values():
+            self._fail(keys, f"el proceso de precarga terminó con código {code}")
+        self.catalog.save()
+
+    def is_ready(self, key):
+        return self.status.get(key) == READY
+
+    def ready_count(self):
+        return sum(1 for state in self.status.values() if state == READY)
+
+    @property
+    def done(self):
+        return all(state != PENDING for state in self.status.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.preload',
+                                     description='Preload patient workbooks and risk timelines into the disk cache')
+    parser.add_argument('--data-dir', default='data/HEMODINAMICA', help='folder with the patient workbooks')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('patients', nargs='+', help='patient ids to preload')
+    args = parser.parse_args(argv)
+    preload_cohort(args.patients, args.data_dir, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.data_processor import read_patient_data
+from utils.patient_store import PatientRecord
+from utils.risk_index import score_record
+from utils.resample import ResampleIndex, resample
+from utils.stats import TimeWeightedRiskStats, RISK_THRESHOLDS
+from utils.schema import TIME
+
+
+def discover_patients(data_dir):
+    """Devuelve los identificadores de paciente (nombre sin extensión) de los .xlsx de una carpeta"""
+    paths = glob.glob(os.path.join(data_dir, '*.xlsx'))
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    # Orden numérico cuando los nombres son números (1, 2, ..., 20)
+    return sorted(stems, key=lambda s: (not s.isdigit(), int(s) if s.isdigit() else 0, s))
+
+
+def find_alerts(time_arr, risk, threshold):
+    """Agrupa las muestras consecutivas con riesgo >= umbral en episodios de alerta"""
+    above = np.concatenate(([False], risk >= threshold, [False]))
+    edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2] - 1
+    peaks = [float(risk[s:e + 1].max()) for s, e in zip(starts, ends)]
+    return pd.DataFrame({
+        'start': time_arr[starts],
+        'end': time_arr[ends],
+        'duration_s': time_arr[ends] - time_arr[starts],
+        'samples': ends - starts + 1,
+        'peak_risk': peaks,
+    })
+
+
+def summarize(patient_id, time_arr, risk):
+    """Estadísticas de un paciente a partir de su línea temporal de riesgo"""
+    stats = {'patient': patient_id, 'rows': len(risk)}
+    if len(risk) == 0:
+        return stats
+    stats['duration_s'] = float(time_arr[-1] - time_arr[0])
+    stats['max_risk'] = float(risk.max())
+    # Tiempos ponderados por los intervalos reales entre muestras (huecos acotados)
+    time_stats = TimeWeightedRiskStats()
+    time_stats.extend(time_arr, risk)
+    window = time_stats.window()
+    stats['average_risk'] = window['average_risk'] if window else float(risk.mean())
+    for threshold in RISK_THRESHOLDS:
+        stats[f'time_above_{threshold}_min'] = window[f'minutes_above_{threshold}'] if window else 0.0
+    return stats
+
+
+# Remuestreos de los pacientes replicados en este proceso
+resample_index = ResampleIndex()
+
+
+def grid_table(record, risk, step):
+    """Canales principales y riesgo del registro remuestreados (LOCF) en una rejilla uniforme de `step` s"""
+    grid, block, names = resample_index.get(record, step)
+    rows = [names.index(name) for name in ('MAP', 'CO', 'SVV', 'PPV') if name in names]
+    table = pd.DataFrame(block[rows].T, columns=[names[i] for i in rows])
+    table['risk'] = resample(record.channel(TIME), risk, grid, max_gap=resample_index.max_gap)[0]
+    table.insert(0, 'time', grid)
+    return table
+
+
+def replay_patient(patient_id, data_dir, out_dir, alert_threshold=80, grid_step=None):
+    """Reproduce la línea temporal completa de un paciente y escribe sus tablas
+
+    Un libro que falta o no se puede leer lanza una excepción: nunca se reproducen datos simulados.
+    """
+    df = read_patient_data(patient_id, data_dir)
+    record = PatientRecord(patient_id, df)
+    time_arr = record.channel(TIME).astype(np.float64)
+    risk = score_record(record)
+
+    risk_table = pd.DataFrame({'time': time_arr, 'risk': risk, 'alert': risk >= alert_threshold})
+    for name in ('MAP', 'CO', 'SVV', 'PPV'):
+        if record.has(name):
+            risk_table[name] = record.column(name)
+    alerts = find_alerts(time_arr, risk, alert_threshold)
+
+    risk_table.to_csv(os.path.join(out_dir, f"{patient_id}_risk.csv"), index=False)
+    alerts.to_csv(os.path.join(out_dir, f"{patient_id}_alerts.csv"), index=False)
+    if grid_step:
+        grid_table(record, risk, grid_step).to_csv(os.path.join(out_dir, f"{patient_id}_grid.csv"), index=False)
+
+    stats = summarize(patient_id, time_arr, risk)
+    stats['alerts'] = len(alerts)
+    return stats
+
+
+def replay_cohort(data_dir, out_dir, workers=None, alert_threshold=80, patients=None, grid_step=None):
+    """Reproduce todos los pacientes en paralelo
+
+    Devuelve la tabla de estadísticas, el tiempo total y los pacientes
+    omitidos ({paciente: error}) porque su libro falta o no se pudo leer.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    patients = patients or discover_patients(data_dir)
+    started = time.perf_counter()
+    rows, skipped = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(replay_patient, pid, data_dir, out_dir, alert_threshold, grid_step): pid
+                   for pid in patients}
+        for future, pid in futures.items():
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                skipped[pid] = str(e)
+    elapsed = time.perf_counter() - started
+    stats = pd.DataFrame(rows)
+    stats.to_csv(os.path.join(out_dir, 'statistics.csv'), index=False)
+    return stats, elapsed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rosphere replay',
+                                     description='Headless replay and risk scoring of a patient cohort')
+    parser.add_argument('--data-dir', default='data/HEMODINAMICA', help='folder with the patient workbooks')
+    parser.add_argument('--out-dir', default='replay_output', help='folder for the output tables')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--alert-threshold', type=float, default=80, help='risk (%%) that raises an alert')
+    parser.add_argument('--grid', type=float, default=None, metavar='SECONDS',
+                        help='also write each patient resampled on a uniform grid of this step')
+    parser.add_argument('patients', nargs='*', help='patient ids to replay (default: every workbook)')
+    args = parser.parse_args(argv)
+
+    stats, elapsed, skipped = replay_cohort(args.data_dir, args.out_dir, args.workers,
+                                            args.alert_threshold, args.patients or None, args.grid)
+    total_rows = int(stats['rows'].sum()) if len(stats) else 0
+    rate = total_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Replayed {len(stats)} patients, {total_rows} rows in {elapsed:.2f} s ({rate:,.0f} rows/s)")
+    print(f"Tables written to {os.path.abspath(args.out_dir)}")
+    for pid, error in skipped.items():
+        print(f"Skipped patient {pid}: {error}")
+    return 1 if skipped else 0
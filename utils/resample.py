@@ -0,0 +1,173 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.schema import CHANNELS, CHANNEL_INDEX, TIME, NOMINAL_INTERVAL_SECONDS
+
+# Métodos de remuestreo: último valor observado (LOCF) o interpolación lineal
+METHODS = ('locf', 'linear')
+
+# Hueco máximo (s) entre muestras de origen que se puede cubrir; más allá el punto queda en NaN
+MAX_GAP_SECONDS = 120
+
+# Remuestreos guardados en memoria (registro, paso y método)
+MAX_GRIDS = 16
+
+
+def uniform_grid(start, stop, step=NOMINAL_INTERVAL_SECONDS):
+    """Rejilla uniforme de tiempos [start, stop] con paso `step` (s), anclada en múltiplos del paso"""
+    if step <= 0:
+        raise ValueError("El paso de la rejilla debe ser positivo")
+    if not np.isfinite(start) or not np.isfinite(stop) or stop < start:
+        return np.empty(0, dtype=np.float64)
+    first = np.ceil(start / step) * step
+    return first + step * np.arange(int(np.floor((stop - first) / step)) + 1, dtype=np.float64)
+
+
+def _sorted_source(time_arr, values):
+    # Descarta las filas sin tiempo y ordena si la fuente no viene ordenada
+    time_arr = np.asarray(time_arr, dtype=np.float64)
+    values = np.atleast_2d(np.asarray(values))
+    keep = ~np.isnan(time_arr)
+    if not keep.all():
+        time_arr, values = time_arr[keep], values[:, keep]
+    if len(time_arr) > 1 and np.any(np.diff(time_arr) < 0):
+        order = np.argsort(time_arr, kind='stable')
+        time_arr, values = time_arr[order], values[:, order]
+    return time_arr, values
+
+
+def resample(time_arr, values, grid, method='locf', max_gap=MAX_GAP_SECONDS):
+    """Lleva un bloque (canal x fila) con tiempos irregulares a los tiempos de `grid`
+
+    Cada punto de la rejilla se localiza entre dos muestras de origen con un
+    solo `np.searchsorted` compartido por todos los canales. 'locf' toma la
+    última muestra observada; 'linear' interpola entre la anterior y la
+    siguiente. No se extrapola fuera del rango de la fuente ni a través de
+    huecos mayores que `max_gap` segundos (None: sin límite); esos puntos
+    quedan en NaN. Devuelve un bloque float32 canal x len(grid).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de remuestreo desconocido: {method}")
+    time_arr, values = _sorted_source(time_arr, values)
+    grid = np.asarray(grid, dtype=np.float64)
+    out = np.full((values.shape[0], len(grid)), np.nan, dtype=np.float32)
+    n = len(time_arr)
+    if n == 0 or len(grid) == 0:
+        return out
+    # Índice de la última muestra con tiempo <= punto de la rejilla
+    left = np.searchsorted(time_arr, grid, side='right') - 1
+    inside = (left >= 0) & (grid <= time_arr[-1])
+    left = np.clip(left, 0, n - 1)
+    right = np.minimum(left + 1, n - 1)
+    exact = time_arr[left] == grid
+    if max_gap is not None:
+        if method == 'locf':
+            inside &= grid - time_arr[left] <= max_gap
+        else:
+            inside &= exact | (time_arr[right] - time_arr[left] <= max_gap)
+    if method == 'locf':
+        out[:, inside] = values[:, left[inside]]
+        return out
+    span = time_arr[right] - time_arr[left]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(exact | (span == 0), 0.0, (grid - time_arr[left]) / span)
+    lo, hi = values[:, left[inside]], values[:, right[inside]]
+    w = weight[inside]
+    # En un punto exacto solo cuenta la muestra de la izquierda (la derecha puede ser NaN)
+    out[:, inside] = np.where(w == 0, lo, lo + w * (hi - lo))
+    return out
+
+
+def align(sources, step=NOMINAL_INTERVAL_SECONDS, method='locf', span='union', max_gap=MAX_GAP_SECONDS):
+    """Alinea varias fuentes (nombre -> (tiempos, bloque canal x fila)) en una misma rejilla
+
+    La rejilla cubre la unión ('union') o la intersección ('intersection') de
+    los rangos de tiempo de las fuentes. Devuelve (rejilla, {nombre: bloque
+    remuestreado}); todas las fuentes comparten la rejilla, así que sus
+    bloques se pueden apilar columna a columna.
+    """
+    if span not in ('union', 'intersection'):
+        raise ValueError(f"Rango de alineación desconocido: {span}")
+    bounds = []
+    for time_arr, _ in sources.values():
+        time_arr = np.asarray(time_arr, dtype=np.float64)
+        if np.any(~np.isnan(time_arr)):
+            bounds.append((np.nanmin(time_arr), np.nanmax(time_arr)))
+    if not bounds:
+        grid = np.empty(0, dtype=np.float64)
+    elif span == 'union':
+        grid = uniform_grid(min(b[0] for b in bounds), max(b[1] for b in bounds), step)
+    else:
+        grid = uniform_grid(max(b[0] for b in bounds), min(b[1] for b in bounds), step)
+    return grid, {name: resample(time_arr, values, grid, method, max_gap)
+                  for name, (time_arr, values) in sources.items()}
+
+
+def record_source(record, channels=None):
+    """(tiempos, bloque canal x fila) de los canales presentes de un registro del almacén"""
+    names = [name for name in (channels or CHANNELS[1:]) if record.has(name)]
+    data = record.data
+    return data[TIME], data[[CHANNEL_INDEX[name] for name in names]], names
+
+
+class ResampleIndex:
+    """Registros remuestreados en rejillas uniformes, por contenido, paso y método
+
+    Cada (hash del libro, paso, método) se remuestrea una vez y se reutiliza
+    mientras el registro no crezca; un registro en ingesta o en vivo se
+    remuestrea de nuevo cuando llegan filas. Se guardan los `max_grids`
+    usados más recientemente; `forget` suelta los de un registro que el
+    almacén deja de usar.
+    """
+
+    def __init__(self, max_grids=MAX_GRIDS, max_gap=MAX_GAP_SECONDS):
+        self.max_grids = max_grids
+        self.max_gap = max_gap
+        self.hits = 0
+        self.misses = 0
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _source(record):
+        # Los registros sin hash (en vivo, de una réplica) se identifican por su clave
+        return record.source_digest or record.key
+
+    def get(self, record, step=NOMINAL_INTERVAL_SECONDS, method='locf'):
+        """Devuelve (rejilla, bloque canal x punto, nombres de canal) de los canales presentes del registro"""
+        memo_key = (self._source(record), step, method)
+        n_rows = record.n_rows
+        with self._lock:
+            entry = self._grids.get(memo_key)
+            if entry is not None and entry[0] == n_rows:
+                self._grids.move_to_end(memo_key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # El remuestreo se hace fuera del candado: dos sesiones a la vez solo repiten trabajo
+        time_arr, values, names = record_source(record)
+        time_arr, values = time_arr[:n_rows], values[:, :n_rows]
+        grid, blocks = align({'record': (time_arr, values)}, step, method, max_gap=self.max_gap)
+        block = blocks['record']
+        grid.setflags(write=False)
+        block.setflags(write=False)
+        with self._lock:
+            self._grids[memo_key] = (n_rows, (grid, block, names))
+            self._grids.move_to_end(memo_key)
+            while len(self._grids) > self.max_grids:
+                self._grids.popitem(last=False)
+        return grid, block, names
+
+    def forget(self, record):
+        """Suelta los remuestreos de un registro"""
+        source = self._source(record)
+        with self._lock:
+            for memo_key in [k for k in self._grids if k[0] == source]:
+                del self._grids[memo_key]
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+
+    def __len__(self):
+        return len(self._grids)
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def calculate_risk_array(map_vals, co_vals, svv_vals, pvv_vals):
+    """Calcula el índice de riesgo para bloques completos de muestras (array in / array out)"""
+    map_vals = np.asarray(map_vals, dtype=np.float64)
+    co_vals = np.asarray(co_vals, dtype=np.float64)
+    svv_vals = np.asarray(svv_vals, dtype=np.float64)
+    pvv_vals = np.asarray(pvv_vals, dtype=np.float64)
+    score = (map_vals - 60) + (co_vals * 10) - (svv_vals * 0.5) - (pvv_vals * 0.5)
+    return 100 - np.clip(score, 0, 100)
+
+
+def _range_risk(values, conditions, risks):
+    # Equivalente vectorizado de la cadena if/elif: gana la primera condición cierta
+    return np.select([cond(values) for cond in conditions], risks, default=0.0)
+
+
+def predict_sto2_array(map_vals, co_vals, svv_vals, pvv_vals, rng=None):
+    """Predice la probabilidad (%) de StO2 <65% en 10 minutos para bloques de muestras
+
+    Acepta arrays de cualquier forma (p. ej. todas las filas de un paciente o
+    una matriz pacientes x filas). El ruido se toma de `rng`, un
+    numpy.random.Generator; pasar uno con semilla hace el resultado reproducible.
+    Sin `rng` se usa el generador global de numpy, así np.random.seed sigue valiendo.
+    """
+    if rng is None:
+        rng = np.random
+    map_vals, co_vals, svv_vals, pvv_vals = np.broadcast_arrays(
+        np.asarray(map_vals, dtype=np.float64),
+        np.asarray(co_vals, dtype=np.float64),
+        np.asarray(svv_vals, dtype=np.float64),
+        np.asarray(pvv_vals, dtype=np.float64),
+    )
+
+    # Factores de riesgo según rangos
+    map_risk = _range_risk(map_vals,
+                           [lambda v: v < 65, lambda v: v < 70, lambda v: v > 100],
+                           [0.4, 0.2, 0.3])
+    co_risk = _range_risk(co_vals,
+                          [lambda v: v < 2.5, lambda v: v < 4.0, lambda v: v > 8.0],
+                          [0.4, 0.2, 0.3])
+    svv_risk = _range_risk(svv_vals,
+                           [lambda v: v > 17, lambda v: v > 13],
+                           [0.3, 0.15])
+    pvv_risk = _range_risk(pvv_vals,
+                           [lambda v: v > 15, lambda v: v > 12],
+                           [0.3, 0.15])
+
+    # Calcular probabilidad final
+    risk = (map_risk * 0.35) + (co_risk * 0.35) + (svv_risk * 0.15) + (pvv_risk * 0.15)
+    risk = risk + rng.normal(0, 0.05, size=risk.shape)  # Añadir variabilidad
+    return np.clip(risk, 0.0, 1.0) * 100  # Devolver como porcentaje
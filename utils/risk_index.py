@@ -0,0 +1,101 @@
+import hashlib
+import inspect
+import threading
+import numpy as np
+from utils.cache import load_cached_array, store_array
+from utils.risk import calculate_risk_array
+from utils import cleaning
+
+# Valores usados en el cálculo del riesgo cuando un canal no existe en el registro
+RISK_DEFAULTS = {'MAP': 75, 'CO': 5.0, 'SVV': 12, 'PPV': 11}
+
+
+def score_rows(record, start=0, stop=None):
+    """Calcula el riesgo de las filas [start, stop) de un registro del almacén de pacientes"""
+    stop = record.n_rows if stop is None else stop
+    channels = []
+    for name in ('MAP', 'CO', 'SVV', 'PPV'):
+        column = record.column(name)
+        channels.append(column[start:stop] if column is not None else RISK_DEFAULTS[name])
+    risk = calculate_risk_array(*channels)
+    return np.broadcast_to(risk, (max(0, stop - start),)).astype(np.float32)
+
+
+def score_record(record):
+    """Calcula el riesgo de todas las filas de un registro del almacén de pacientes"""
+    return score_rows(record)
+
+
+def model_version(*functions):
+    """Huella del código de las funciones de puntuación (y de la limpieza de datos): cambia si cambia el modelo"""
+    sha = hashlib.sha1(repr(sorted(RISK_DEFAULTS.items())).encode('utf-8'))
+    sha.update(repr((sorted(cleaning.PHYSIOLOGIC_RANGES.items()), sorted(cleaning.SPIKE_FLOORS.items()),
+                     cleaning.SPIKE_WINDOW, cleaning.SPIKE_MADS, cleaning.MAX_FILL_SECONDS)).encode('utf-8'))
+    for func in functions:
+        try:
+            sha.update(inspect.getsource(func).encode('utf-8'))
+        except (OSError, TypeError):
+            sha.update(func.__code__.co_code)
+    return sha.hexdigest()[:12]
+
+
+class RiskTimelineIndex:
+    """Índice de líneas temporales de riesgo precalculadas, una por paciente y versión de modelo
+
+    Cada línea está alineada fila a fila con la columna de tiempo del registro,
+    así la reproducción solo toma tramos. Se guarda en la caché columnar con
+    clave (hash del archivo de origen, versión del modelo). En memoria se
+    guardan mientras el registro sigue en el almacén: forget() las suelta
+    cuando el almacén lo expulsa o lo libera.
+    """
+
+    def __init__(self, scorer=score_record, cache_dir=None):
+        self.scorer = scorer
+        self.cache_dir = cache_dir
+        self.version = model_version(scorer, score_rows, calculate_risk_array, cleaning.SignalCleaner.clean)
+        self._timelines = {}
+        self._lock = threading.Lock()
+
+    def _cache_name(self, record):
+        if record.source_digest is None:
+            return None
+        return f"risk-{record.source_digest}-{self.version}"
+
+    def get(self, record):
+        """Devuelve la línea de riesgo (solo lectura) del registro, calculándola la primera vez"""
+        if not record.complete:
+            # Registro aún en ingesta: no se guarda nada que luego quede incompleto
+            return self.scorer(record)
+        memo_key = (record.key, record.source_digest)
+        timeline = self._timelines.get(memo_key)
+        if timeline is not None and len(timeline) == record.n_rows:
+            return timeline
+        with self._lock:
+            timeline = self._timelines.get(memo_key)
+            if timeline is None or len(timeline) != record.n_rows:
+                name = self._cache_name(record)
+                timeline = load_cached_array(name, self.cache_dir) if name else None
+                if timeline is None or len(timeline) != record.n_rows:
+                    timeline = self.scorer(record)
+                    if name:
+                        store_array(name, timeline, {'patient': str(record.key), 'model': self.version},
+                                    self.cache_dir)
+                timeline.setflags(write=False)
+                self._timelines[memo_key] = timeline
+        return timeline
+
+    def forget(self, record):
+        """Suelta la línea en memoria de un registro (queda en la caché de disco)"""
+        with self._lock:
+            self._timelines.pop((record.key, record.source_digest), None)
+
+    def rows(self, record, start, stop):
+        """Riesgo de las filas [start, stop): tramo del índice, o cálculo directo si el registro crece"""
+        if record.complete:
+            return self.get(record)[start:stop]
+        return score_rows(record, start, stop)
+
+    def warm(self, store, keys):
+        """Construye por adelantado las líneas de riesgo de los pacientes indicados"""
+        for key in keys:
+            self.get(store.get(key))
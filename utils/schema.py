@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Canales canónicos (mismo orden que las exportaciones tipo Edwards, con Time primero)
+CHANNELS = ('Time', 'MAP', 'CO', 'SVV', 'PPV', 'HPI', 'Eadyn', 'dPdtmax', 'HR', 'SV',
+            'CI', 'SVI', 'RVSI', 'SBP', 'DBP', 'ASBP', 'ADBP', 'PP', 'Ts', 'AT')
+
+# Posición de cada canal en el bloque normalizado: los caminos calientes indexan por posición
+CHANNEL_INDEX = {name: i for i, name in enumerate(CHANNELS)}
+TIME = CHANNEL_INDEX['Time']
+MAP = CHANNEL_INDEX['MAP']
+CO = CHANNEL_INDEX['CO']
+SVV = CHANNEL_INDEX['SVV']
+PPV = CHANNEL_INDEX['PPV']
+
+# Nombres alternativos vistos en las fuentes (la comparación ignora mayúsculas y espacios)
+ALIASES = {
+    'Time': ('time', 'tiempo', 'tiempo_segundos', 'time_s', 'seconds'),
+    'MAP': ('pam', 'mean_arterial_pressure'),
+    'CO': ('gc', 'gasto_cardiaco', 'cardiac_output'),
+    'SVV': ('vvs',),
+    'PPV': ('pvv', 'vpp'),
+    'HR': ('fc', 'heart_rate'),
+    'SV': ('vs', 'stroke_volume'),
+}
+
+# Canales sin los que el monitor no puede calcular el riesgo
+REQUIRED_CHANNELS = ('Time', 'MAP', 'CO', 'SVV', 'PPV')
+
+# Intervalo nominal de muestreo (s) usado solo si la fuente no trae columna de tiempo
+NOMINAL_INTERVAL_SECONDS = 20
+
+
+def _normalize_name(name):
+    return str(name).strip().lower().replace(' ', '_')
+
+
+def resolve_columns(columns):
+    """Asocia cada canal canónico con la columna de origen que lo contiene"""
+    lookup = {}
+    for column in columns:
+        lookup.setdefault(_normalize_name(column), column)
+    resolved = {}
+    for channel in CHANNELS:
+        for candidate in (channel,) + ALIASES.get(channel, ()):
+            source = lookup.get(_normalize_name(candidate))
+            if source is not None:
+                resolved[channel] = source
+                break
+    return resolved
+
+
+class NormalizedFrame:
+    """Bloque float32 (canal x fila) en el orden de CHANNELS, con máscara de valores ausentes"""
+
+    __slots__ = ('data', 'mask', 'present', 'missing', 'n_rows')
+
+    def __init__(self, data, present, missing):
+        self.data = data
+        self.mask = np.isnan(data)
+        self.present = present
+        self.missing = missing
+        self.n_rows = data.shape[1]
+
+    def column(self, name):
+        """Columna de un canal por nombre canónico, o None si la fuente no lo trae"""
+        idx = CHANNEL_INDEX.get(name)
+        if idx is None or not self.present[idx]:
+            return None
+        return self.data[idx]
+
+
+def normalize_frame(df, source='', warn=True, row_offset=0):
+    """Convierte un DataFrame de cualquier fuente al esquema canónico, una sola vez al cargar
+
+    Los canales que faltan quedan como NaN y se avisa de ellos; no se
+    inventan datos. La única excepción es Time: sin él no hay reproducción,
+    así que se reconstruye con el intervalo nominal y se avisa (row_offset
+    indica la primera fila del bloque cuando se normaliza por partes).
+    """
+    resolved = resolve_columns(df.columns)
+    n_rows = len(df)
+    data = np.full((len(CHANNELS), n_rows), np.nan, dtype=np.float32)
+    present = np.zeros(len(CHANNELS), dtype=bool)
+    for channel, column in resolved.items():
+        values = pd.to_numeric(df[column], errors='coerce')
+        data[CHANNEL_INDEX[channel]] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        present[CHANNEL_INDEX[channel]] = True
+
+    missing = [channel for channel in REQUIRED_CHANNELS if not present[CHANNEL_INDEX[channel]]]
+    if missing and warn:
+        label = f" en {source}" if source else ""
+        print(f"Aviso: faltan los canales {', '.join(missing)}{label}")
+    if not present[TIME]:
+        data[TIME] = (row_offset + np.arange(n_rows, dtype=np.float32)) * NOMINAL_INTERVAL_SECONDS
+        present[TIME] = True
+    return NormalizedFrame(data, present, missing)
@@ -0,0 +1,196 @@
+import numpy as np
+
+# Umbrales de riesgo (%) contados por el acumulador
+RISK_THRESHOLDS = (65, 80, 90)
+
+
+class RiskStats:
+    """Acumulador en streaming de las estadísticas de la tendencia de riesgo
+
+    Cada muestra nueva se incorpora en O(1): cuentas por encima de cada umbral,
+    media y varianza (Welford), máximo y una pendiente suavizada
+    exponencialmente. Leer el resumen no recorre el historial.
+    """
+
+    __slots__ = ('alpha', 'count', 'mean', 'm2', 'max', 'slope', 'last', 'above')
+
+    def __init__(self, alpha=0.1):
+        # alpha de la media exponencial de la pendiente (≈ ventana de 1/alpha muestras)
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.max = None
+        self.slope = 0.0
+        self.last = None
+        self.above = {threshold: 0 for threshold in RISK_THRESHOLDS}
+
+    def push(self, value):
+        """Incorpora una muestra"""
+        value = float(value)
+        if value != value:
+            # NaN: no aporta a las estadísticas
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.last is not None:
+            self.slope += self.alpha * ((value - self.last) - self.slope)
+        self.last = value
+        for threshold in RISK_THRESHOLDS:
+            if value >= threshold:
+                self.above[threshold] += 1
+
+    def extend(self, values):
+        """Incorpora un bloque de muestras combinando sus momentos de una vez (Chan et al.)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n_b = len(values)
+        if n_b == 0:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        block_max = float(values.max())
+        self.max = block_max if self.max is None else max(self.max, block_max)
+
+        # Pendiente exponencial: forma cerrada de la recurrencia sobre las diferencias del bloque
+        diffs = np.diff(values) if self.last is None else np.diff(values, prepend=self.last)
+        if len(diffs):
+            decay = 1.0 - self.alpha
+            weights = self.alpha * decay ** np.arange(len(diffs) - 1, -1, -1)
+            self.slope = decay ** len(diffs) * self.slope + float(weights @ diffs)
+        self.last = float(values[-1])
+
+        for threshold in RISK_THRESHOLDS:
+            self.above[threshold] += int(np.count_nonzero(values >= threshold))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def trend_direction(self):
+        """Dirección de la tendencia a partir del cambio esperado en ~1/alpha muestras"""
+        if self.count <= 5:
+            return "Insufficient data"
+        change = self.slope / self.alpha
+        if change > 5:
+            return "Strongly Increasing"
+        elif change > 1:
+            return "Increasing"
+        elif change < -5:
+            return "Strongly Decreasing"
+        elif change < -1:
+            return "Decreasing"
+        return "Stable"
+
+
+# Hueco máximo (s) que se acredita entre dos muestras; las exportaciones muestrean cada 20 s
+MAX_GAP_SECONDS = 60
+
+
+class TimeWeightedRiskStats:
+    """Estadísticas del riesgo ponderadas por el tiempo real entre muestras
+
+    Cada muestra representa el intervalo hasta la siguiente (acotado a
+    `max_gap` para no acreditar datos ausentes como tiempo en riesgo). Se
+    guardan sumas prefijas del tiempo total, del tiempo por encima de cada
+    umbral y de riesgo x tiempo, así cualquier ventana (últimos 10/30/60 min)
+    se resuelve con una búsqueda binaria y dos restas.
+    """
+
+    __slots__ = ('max_gap', '_time', '_prefix', '_last_risk', '_n')
+
+    def __init__(self, max_gap=MAX_GAP_SECONDS, capacity=256):
+        self.max_gap = max_gap
+        self._time = np.empty(capacity, dtype=np.float64)
+        # Filas: tiempo total, riesgo x tiempo y tiempo por encima de cada umbral
+        self._prefix = np.empty((2 + len(RISK_THRESHOLDS), capacity), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._n = 0
+        self._last_risk = None
+
+    def __len__(self):
+        return self._n
+
+    def _reserve(self, extra):
+        needed = self._n + extra
+        if needed <= len(self._time):
+            return
+        capacity = max(needed, 2 * len(self._time))
+        time_arr = np.empty(capacity, dtype=np.float64)
+        time_arr[:self._n] = self._time[:self._n]
+        prefix = np.empty((self._prefix.shape[0], capacity), dtype=np.float64)
+        prefix[:, :self._n] = self._prefix[:, :self._n]
+        self._time, self._prefix = time_arr, prefix
+
+    def extend(self, time_vals, risk_vals):
+        """Añade un bloque de muestras; se ignoran las que no avanzan en el tiempo o son NaN"""
+        time_vals = np.asarray(time_vals, dtype=np.float64)
+        risk_vals = np.asarray(risk_vals, dtype=np.float64)
+        valid = ~(np.isnan(time_vals) | np.isnan(risk_vals))
+        time_vals, risk_vals = time_vals[valid], risk_vals[valid]
+        if self._n:
+            # Solo tiempos estrictamente crecientes respecto a lo ya acumulado
+            keep = time_vals > self._time[self._n - 1]
+            time_vals, risk_vals = time_vals[keep], risk_vals[keep]
+        if len(time_vals) > 1:
+            keep = np.concatenate(([True], np.diff(time_vals) > 0))
+            time_vals, risk_vals = time_vals[keep], risk_vals[keep]
+        count = len(time_vals)
+        if count == 0:
+            return
+
+        # Intervalo que precede a cada muestra nueva, acreditado a la muestra anterior
+        if self._n:
+            prev_time = np.concatenate(([self._time[self._n - 1]], time_vals[:-1]))
+            prev_risk = np.concatenate(([self._last_risk], risk_vals[:-1]))
+            base = self._prefix[:, self._n - 1]
+        else:
+            prev_time = np.concatenate(([time_vals[0]], time_vals[:-1]))
+            prev_risk = np.concatenate(([0.0], risk_vals[:-1]))
+            base = np.zeros(self._prefix.shape[0])
+        dt = np.minimum(time_vals - prev_time, self.max_gap)
+
+        rows = [dt, dt * prev_risk] + [dt * (prev_risk >= threshold) for threshold in RISK_THRESHOLDS]
+        self._reserve(count)
+        self._time[self._n:self._n + count] = time_vals
+        self._prefix[:, self._n:self._n + count] = base[:, None] + np.cumsum(rows, axis=1)
+        self._n += count
+        self._last_risk = float(risk_vals[-1])
+
+    def append(self, time_val, risk):
+        self.extend([time_val], [risk])
+
+    def window(self, minutes=None):
+        """Resumen (en minutos) de la ventana final indicada, o de todo el registro si minutes es None"""
+        if self._n < 2:
+            return None
+        end = self._n - 1
+        if minutes is None:
+            start = 0
+        else:
+            start_time = self._time[end] - minutes * 60
+            start = min(int(np.searchsorted(self._time[:self._n], start_time, side='left')), end)
+        sums = self._prefix[:, end] - self._prefix[:, start]
+        covered = sums[0]
+        if covered <= 0:
+            return None
+        summary = {
+            'covered_minutes': float(covered) / 60,
+            'average_risk': float(sums[1] / covered),
+        }
+        for i, threshold in enumerate(RISK_THRESHOLDS):
+            summary[f'minutes_above_{threshold}'] = float(sums[2 + i]) / 60
+        return summary
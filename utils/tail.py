@@ -0,0 +1,185 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+from utils.schema import normalize_frame
+from utils.ingest import iter_xlsx_chunks
+from utils.patient_store import PatientRecord
+
+# Intervalo de sondeo del archivo (s)
+POLL_SECONDS = 1.0
+
+# Archivos seguidos a la vez por servidor
+MAX_TAILERS = 4
+
+
+def tail_key(file_path):
+    """Clave en el almacén de pacientes de un archivo seguido"""
+    return f"tail:{os.path.abspath(file_path)}"
+
+
+class FileTailer:
+    """Sigue una exportación de monitor que crece durante la cirugía
+
+    Sondea el mtime y el tamaño del archivo y solo procesa lo añadido desde
+    la última lectura: en un CSV, los bytes a partir del último desplazamiento
+    (solo líneas completas); en un XLSX, que se reescribe entero al guardar,
+    las filas posteriores a las ya cargadas, sin convertir las anteriores.
+    Las filas nuevas se añaden a un PatientRecord `live`, así que la
+    reproducción las recibe como las de un monitor en vivo. Si el archivo
+    desaparece, la exportación se da por cerrada: el registro se libera del
+    almacén y, si el archivo vuelve a aparecer, se sigue desde cero.
+    """
+
+    def __init__(self, file_path, store=None, poll_interval=POLL_SECONDS):
+        if not file_path.endswith(('.csv', '.xlsx')):
+            raise ValueError("Solo se pueden seguir archivos .csv o .xlsx")
+        self.file_path = file_path
+        self.poll_interval = poll_interval
+        self.store = store
+        self.record = self._new_record()
+        self.polls = 0
+        self.updates = 0
+        self._stat = None
+        self._offset = 0
+        self._header = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _new_record(self):
+        record = PatientRecord(tail_key(self.file_path), live=True)
+        if self.store is not None:
+            record = self.store.register(tail_key(self.file_path), record)
+        return record
+
+    def close(self):
+        """Libera el registro del almacén y vuelve a empezar con uno vacío"""
+        if self.store is not None:
+            self.store.release(self.record.key)
+        self.record = self._new_record()
+        self._stat = None
+        self._offset = 0
+        self._header = None
+
+    def poll(self):
+        """Lee lo añadido desde el último sondeo; devuelve el número de filas nuevas"""
+        self.polls += 1
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            if self.record.n_rows and not os.path.exists(self.file_path):
+                # El archivo se borró: la exportación terminó
+                self.close()
+            return 0
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._stat:
+            return 0
+        if self.file_path.endswith('.csv'):
+            if stat.st_size < self._offset:
+                # El archivo se truncó o se reemplazó: las filas ya cargadas no se pueden retirar
+                self.record.error = "El archivo seguido se truncó"
+                self._stat = signature
+                return 0
+            df = self._read_csv()
+        else:
+            df = self._read_xlsx()
+        # Solo se marca como leído si la lectura terminó (un xlsx a medio guardar se reintenta)
+        self._stat = signature
+        if df is None or len(df) == 0:
+            return 0
+        self.record.append(normalize_frame(df, os.path.basename(self.file_path), warn=self.record.n_rows == 0,
+                                           row_offset=self.record.n_rows))
+        self.updates += 1
+        return len(df)
+
+    def _read_csv(self):
+        with open(self.file_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Solo líneas completas; el resto se lee cuando el monitor termine de escribirlo
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return None
+        data = data[:end]
+        self._offset += end
+        if self._header is None:
+            header_end = data.find(b'\n') + 1
+            self._header, data = data[:header_end], data[header_end:]
+        if not data.strip():
+            return None
+        return pd.read_csv(io.BytesIO(self._header + data))
+
+    def _read_xlsx(self):
+        chunks = iter_xlsx_chunks(self.file_path, skip_rows=self.record.n_rows)
+        next(chunks)
+        frames = list(chunks)
+        if not frames:
+            return None
+        df = pd.concat(frames, ignore_index=True)
+        # Las filas vacías del final aún no tienen datos: se leerán cuando se escriban
+        filled = df.notna().any(axis=1).to_numpy().nonzero()[0]
+        return df.iloc[:filled[-1] + 1] if len(filled) else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # Archivo a medio escribir u otro fallo transitorio: se reintenta en el siguiente sondeo
+                print(f"Error al seguir {self.file_path}: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Sondea el archivo en un hilo de fondo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='file-tail', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+class TailerRegistry:
+    """Seguidores de archivo compartidos por las sesiones del servidor
+
+    Un seguidor por archivo, como mucho `max_tailers` a la vez: al pedir uno
+    nuevo se descarta el usado hace más tiempo, cuyo hilo de sondeo se
+    detiene y cuyo registro se libera del almacén. Así un navegador que
+    prueba muchos nombres no deja un hilo vivo por cada uno.
+    """
+
+    def __init__(self, store=None, max_tailers=MAX_TAILERS, poll_interval=POLL_SECONDS):
+        self.store = store
+        self.max_tailers = max_tailers
+        self.poll_interval = poll_interval
+        self._tailers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """Seguidor (ya en marcha) del archivo; lo crea si no existe"""
+        with self._lock:
+            tailer = self._tailers.get(file_path)
+            if tailer is not None:
+                self._tailers.move_to_end(file_path)
+                return tailer
+            tailer = self._tailers[file_path] = FileTailer(file_path, self.store, self.poll_interval).start()
+            while len(self._tailers) > self.max_tailers:
+                _, evicted = self._tailers.popitem(last=False)
+                self._stop(evicted)
+        return tailer
+
+    def _stop(self, tailer):
+        tailer.stop()
+        if self.store is not None:
+            self.store.release(tailer.record.key)
+
+    def close(self):
+        """Detiene todos los seguidores"""
+        with self._lock:
+            while self._tailers:
+                self._stop(self._tailers.popitem()[1])
+
+    def __len__(self):
+        return len(self._tailers)
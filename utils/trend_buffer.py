@@ -0,0 +1,222 @@
+import itertools
+import numpy as np
+from utils.stats import RiskStats, TimeWeightedRiskStats
+
+# Generaciones únicas entre todos los buffers
+_generations = itertools.count()
+
+
+class TrendBuffer:
+    """Buffer circular de capacidad fija para el historial de tendencias
+
+    Guarda los canales como estructura de arrays (una fila por canal) en un
+    bloque preasignado. Cada muestra se escribe dos veces (posición i e
+    i + capacidad), así los últimos valores siempre forman un tramo contiguo
+    y las vistas ordenadas para graficar no requieren copias.
+
+    `risk_stats` acumula en streaming el resumen del riesgo de todas las
+    muestras añadidas desde el último clear(); `time_stats` hace lo mismo
+    ponderando por el tiempo real entre muestras.
+
+    Cada punto puede representar varias filas de origen fundidas (ver
+    utils.decimate): junto al valor se guarda su envolvente mínimo/máximo y
+    `source_rows` cuenta las filas de origen representadas. Los canales de
+    FLAG_FIELDS llevan además una marca por punto si alguna de sus muestras
+    fue corregida por la limpieza de artefactos. Se lleva la cuenta de los
+    puntos fundidos que siguen en el buffer, así is_decimated() es O(1).
+
+    Con `compact`, un buffer lleno no descarta las muestras más antiguas:
+    funde cada pareja de puntos consecutivos (último valor y envolvente), así
+    cubre todo el historial con una resolución que baja a la mitad cada vez
+    y su memoria no crece con la duración del registro.
+
+    `generation` cambia cuando las vistas dejan de ser las anteriores más
+    muestras nuevas (clear(), una muestra antigua descartada o fundida, o un
+    buffer nuevo), para que quien indexe las vistas sepa si puede extender
+    su índice.
+    """
+
+    FIELDS = ('time', 'map', 'co', 'svv', 'pvv', 'risk')
+    FLAG_FIELDS = ('map', 'co', 'svv', 'pvv')
+
+    __slots__ = ('capacity', 'compact', 'generation', 'risk_stats', 'time_stats', 'source_rows', '_data', '_lo', '_hi', '_flags',
+                 '_merged', '_merged_count', '_start', '_size')
+
+    def __init__(self, capacity=100, compact=False):
+        if capacity <= 0:
+            raise ValueError("La capacidad del buffer debe ser positiva")
+        if compact and capacity < 2:
+            raise ValueError("Un buffer que funde puntos necesita capacidad para al menos dos")
+        self.capacity = int(capacity)
+        self.compact = compact
+        # float32 basta para dibujar (las estadísticas reciben los valores de origen en float64)
+        self._data = np.zeros((len(self.FIELDS), 2 * self.capacity), dtype=np.float32)
+        self._lo = np.zeros_like(self._data)
+        self._hi = np.zeros_like(self._data)
+        self._flags = np.zeros((len(self.FLAG_FIELDS), 2 * self.capacity), dtype=bool)
+        # Puntos que funden más de una fila de origen (una sola copia, por posición del anillo)
+        self._merged = np.zeros(self.capacity, dtype=bool)
+        self._merged_count = 0
+        self._start = 0
+        self._size = 0
+        self.generation = next(_generations)
+        self.source_rows = 0
+        self.risk_stats = RiskStats()
+        self.time_stats = TimeWeightedRiskStats()
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, field):
+        """Vista ordenada (de la más antigua a la más reciente) de un canal"""
+        row = self.FIELDS.index(field)
+        return self._data[row, self._start:self._start + self._size]
+
+    def envelope(self, field):
+        """Vistas ordenadas (mínimo, máximo) de las filas fundidas en cada punto de un canal"""
+        row = self.FIELDS.index(field)
+        view = slice(self._start, self._start + self._size)
+        return self._lo[row, view], self._hi[row, view]
+
+    def flagged(self, field):
+        """Vista ordenada de las marcas de calidad de un canal ('risk': cualquiera de sus entradas)"""
+        view = slice(self._start, self._start + self._size)
+        if field == 'risk':
+            return self._flags[:, view].any(axis=0)
+        return self._flags[self.FLAG_FIELDS.index(field), view]
+
+    def is_decimated(self):
+        """True si algún punto del buffer representa más de una fila de origen"""
+        return self._merged_count > 0
+
+    def keys(self):
+        return self.FIELDS
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self._merged_count = 0
+        self.generation = next(_generations)
+        self.source_rows = 0
+        self.risk_stats.reset()
+        self.time_stats.reset()
+
+    def append(self, time, map_val, co_val, svv_val, pvv_val, risk):
+        """Añade una muestra en O(1), descartando la más antigua (o fundiendo el buffer) si está lleno"""
+        if self.compact and self._size == self.capacity:
+            self._compact()
+        pos = (self._start + self._size) % self.capacity
+        sample = (time, map_val, co_val, svv_val, pvv_val, risk)
+        for arr in (self._data, self._lo, self._hi):
+            arr[:, pos] = sample
+            arr[:, pos + self.capacity] = sample
+        self._flags[:, pos] = False
+        self._flags[:, pos + self.capacity] = False
+        self.source_rows += 1
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            # Se sobrescribe la muestra más antigua
+            self._merged_count -= int(self._merged[pos])
+            self._start = (self._start + 1) % self.capacity
+            self.generation = next(_generations)
+        self._merged[pos] = False
+        self.risk_stats.push(risk)
+        self.time_stats.append(time, risk)
+
+    def extend(self, time, map_vals, co_vals, svv_vals, pvv_vals, risk, lo=None, hi=None, source=None,
+               flags=None):
+        """Añade un bloque de muestras (un array por canal) con escrituras vectorizadas
+
+        `lo`/`hi` son los envolventes (canal x muestra, en el orden de FIELDS)
+        cuando las muestras vienen fundidas; `source` = (tiempo, riesgo) de las
+        filas de origen completas, para que las estadísticas no se diezmen;
+        `flags` las marcas de calidad (canal x muestra, orden de FLAG_FIELDS).
+        """
+        block = np.vstack([np.asarray(time, dtype=np.float64),
+                           np.asarray(map_vals, dtype=np.float64),
+                           np.asarray(co_vals, dtype=np.float64),
+                           np.asarray(svv_vals, dtype=np.float64),
+                           np.asarray(pvv_vals, dtype=np.float64),
+                           np.asarray(risk, dtype=np.float64)])
+        count = block.shape[1]
+        if count == 0:
+            return
+        lo = block if lo is None else np.asarray(lo, dtype=np.float64)
+        hi = block if hi is None else np.asarray(hi, dtype=np.float64)
+        flags = np.zeros((len(self.FLAG_FIELDS), count), dtype=bool) if flags is None else np.asarray(flags, dtype=bool)
+        source_time, source_risk = (block[0], block[5]) if source is None else source
+        self.risk_stats.extend(source_risk)
+        self.time_stats.extend(source_time, source_risk)
+        self.source_rows += len(source_risk)
+        if self.compact:
+            # Llenar el buffer y fundirlo hasta que quepa el resto
+            while self._size + count > self.capacity:
+                take = self.capacity - self._size
+                if take:
+                    self._write(block[:, :take], lo[:, :take], hi[:, :take], flags[:, :take])
+                    block, lo, hi, flags = block[:, take:], lo[:, take:], hi[:, take:], flags[:, take:]
+                    count -= take
+                self._compact()
+        elif count > self.capacity:
+            # Solo sobreviven las últimas `capacity` muestras
+            block, lo, hi = block[:, -self.capacity:], lo[:, -self.capacity:], hi[:, -self.capacity:]
+            flags = flags[:, -self.capacity:]
+        self._write(block, lo, hi, flags)
+
+    def _write(self, block, lo, hi, flags):
+        # Escribe al final del anillo (como mucho `capacity` muestras), descartando las más antiguas
+        count = block.shape[1]
+        pos = (self._start + self._size + np.arange(count)) % self.capacity
+        overflow = max(0, self._size + count - self.capacity)
+        if overflow:
+            # Las muestras más antiguas que se sobrescriben dejan de contar
+            self._merged_count -= int(self._merged[(self._start + np.arange(overflow)) % self.capacity].sum())
+            self.generation = next(_generations)
+        merged = np.any(lo[1:] < hi[1:], axis=0)
+        self._merged[pos] = merged
+        self._merged_count += int(merged.sum())
+        for arr, values in ((self._data, block), (self._lo, lo), (self._hi, hi), (self._flags, flags)):
+            arr[:, pos] = values
+            arr[:, pos + self.capacity] = values
+        self._size = min(self.capacity, self._size + count)
+        self._start = (self._start + overflow) % self.capacity
+
+    def _compact(self):
+        # Funde parejas de puntos consecutivos: último valor, mínimo y máximo, marcas de cualquiera
+        view = slice(self._start, self._start + self._size)
+        starts = np.arange(0, self._size, 2)
+        ends = np.minimum(starts + 1, self._size - 1)
+        block = self._data[:, view][:, ends]
+        lo = np.fmin.reduceat(self._lo[:, view], starts, axis=1)
+        hi = np.fmax.reduceat(self._hi[:, view], starts, axis=1)
+        flags = np.logical_or.reduceat(self._flags[:, view], starts, axis=1)
+        self._start = 0
+        self._size = 0
+        self._merged_count = 0
+        self._write(block, lo, hi, flags)
+        self.generation = next(_generations)
+
+    def resized(self, capacity, compact=None):
+        """Copia del buffer con otra capacidad: conserva las últimas muestras y las estadísticas
+
+        Las estadísticas siguen cubriendo todas las muestras añadidas desde el
+        último clear(), también las que no caben en la nueva capacidad (un
+        buffer `compact` las funde en lugar de descartarlas).
+        """
+        resized = TrendBuffer(capacity, self.compact if compact is None else compact)
+        view = slice(self._start, self._start + self._size)
+        keep = slice(None) if resized.compact else slice(-resized.capacity, None)
+        resized.extend(*self._data[:, view][:, keep],
+                       lo=self._lo[:, view][:, keep], hi=self._hi[:, view][:, keep],
+                       flags=self._flags[:, view][:, keep])
+        resized.source_rows = self.source_rows
+        resized.risk_stats = self.risk_stats
+        resized.time_stats = self.time_stats
+        return resized
+
+    def last(self, field):
+        """Valor más reciente de un canal, o None si el buffer está vacío"""
+        if self._size == 0:
+            return None
+        return self[field][-1]
@@ -0,0 +1,124 @@
+import os
+import atexit
+import heapq
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+
+# Tiempo que se conserva un archivo subido desde su último uso (s)
+DEFAULT_TTL_SECONDS = 600
+
+# Espacio máximo que pueden ocupar los archivos subidos (bytes)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class UploadStore:
+    """Archivos subidos de todo el proceso: un directorio temporal, caducidad y cuota
+
+    Cada archivo caduca `ttl` segundos después de su último guardado. Las
+    caducidades se guardan en un heap y un único hilo conserje duerme hasta la
+    siguiente; si se supera la cuota se borran primero los que antes caducan.
+    """
+
+    def __init__(self, root=None, ttl=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        if root is None:
+            root = tempfile.mkdtemp(prefix='rosphere-uploads-')
+            # El directorio es del proceso: se borra al terminar
+            atexit.register(shutil.rmtree, root, True)
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # ruta -> (caducidad, tamaño); el heap puede tener entradas viejas que se ignoran al sacarlas
+        self._files = {}
+        self._heap = []
+        self._bytes = 0
+        self._removed = 0
+        self._cond = threading.Condition()
+        self._janitor = None
+
+    def save(self, name, data):
+        """Guarda el contenido de un archivo subido y devuelve su ruta; renueva la caducidad si ya existe
+
+        El nombre lleva el hash del contenido, así dos archivos distintos con
+        el mismo nombre no se pisan y volver a guardar el mismo no reescribe.
+        """
+        data = memoryview(data)
+        digest = hashlib.sha1(data).hexdigest()[:12]
+        path = os.path.join(self.root, f"{digest}-{os.path.basename(name)}")
+        with self._cond:
+            if path not in self._files:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._bytes += data.nbytes
+            expires = time.monotonic() + self.ttl
+            self._files[path] = (expires, data.nbytes)
+            heapq.heappush(self._heap, (expires, path))
+            self._enforce_quota(keep=path)
+            self._ensure_janitor()
+            self._cond.notify()
+        return path
+
+    def _remove(self, path):
+        # Llamar con el candado tomado
+        _, size = self._files.pop(path)
+        self._bytes -= size
+        self._removed += 1
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _enforce_quota(self, keep=None):
+        if self._bytes <= self.max_bytes:
+            return
+        for _, path in sorted((expires, path) for path, (expires, _) in self._files.items()):
+            if self._bytes <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+
+    def _expire(self):
+        """Borra los archivos caducados; devuelve la próxima caducidad o None"""
+        now = time.monotonic()
+        while self._heap:
+            expires, path = self._heap[0]
+            entry = self._files.get(path)
+            if entry is None or entry[0] != expires:
+                # Entrada vieja: el archivo se borró o se renovó después
+                heapq.heappop(self._heap)
+                continue
+            if expires > now:
+                return expires
+            heapq.heappop(self._heap)
+            self._remove(path)
+        return None
+
+    def _run_janitor(self):
+        with self._cond:
+            while True:
+                next_expiry = self._expire()
+                timeout = None if next_expiry is None else max(0.0, next_expiry - time.monotonic())
+                self._cond.wait(timeout)
+
+    def _ensure_janitor(self):
+        if self._janitor is None or not self._janitor.is_alive():
+            self._janitor = threading.Thread(target=self._run_janitor, name='upload-janitor', daemon=True)
+            self._janitor.start()
+
+    def usage(self):
+        """Uso actual: archivos y bytes en disco, cuota e hilos vivos del proceso"""
+        with self._cond:
+            return {
+                'root': self.root,
+                'files': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'removed': self._removed,
+                'janitor_alive': self._janitor is not None and self._janitor.is_alive(),
+                'threads': threading.active_count(),
+            }